@@ -0,0 +1,97 @@
+"""
+Extraction benchmark
+Compares the old per-cell WebDriver path with the single round-trip engines
+on the saved results table fixture.
+
+Usage:
+    python benchmarks/bench_extract.py              # all three paths in headless Chrome
+    python benchmarks/bench_extract.py --offline    # lxml parsing only, no browser
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ccr_table import (TABLE_ID, extract_records, parse_table_html,
+                       rows_to_records)
+from scraper_bulk import CCRBulkScraper
+
+FIXTURE = Path(__file__).resolve().parent / "fixtures" / "results_table.html"
+COLUMN_MAPPING = CCRBulkScraper.COLUMN_MAPPING
+
+
+def legacy_extract(driver):
+    """The per-row / per-cell path the scrapers used before ccr_table"""
+    from selenium.webdriver.common.by import By
+
+    main_table = driver.find_element(By.ID, TABLE_ID)
+    rows = main_table.find_elements(By.TAG_NAME, "tr")
+    page_data = []
+    for row in rows[2:]:
+        cells = row.find_elements(By.TAG_NAME, "td")
+        if not cells or len(cells) < 3:
+            continue
+        row_data = {}
+        for i in range(min(9, len(cells))):
+            row_data[COLUMN_MAPPING.get(i, f"Column_{i+1}")] = cells[i].text.strip()
+        if row_data.get("رقم التسجيل") and row_data["رقم التسجيل"] not in ['', 'عرض']:
+            page_data.append(row_data)
+    return page_data
+
+
+def time_it(fn, iterations):
+    result = fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    return result, elapsed / iterations * 1000
+
+
+def run_offline(iterations):
+    html = FIXTURE.read_text(encoding='utf-8')
+    records, ms = time_it(
+        lambda: rows_to_records(parse_table_html(html), COLUMN_MAPPING), iterations)
+    print(f"lxml parse only: {ms:8.3f} ms/page ({len(records)} records)")
+
+
+def run_browser(iterations):
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new')
+    driver = webdriver.Chrome(options=options)
+    try:
+        driver.get(FIXTURE.as_uri())
+        baseline, legacy_ms = time_it(lambda: legacy_extract(driver), iterations)
+        print(f"legacy per-cell: {legacy_ms:8.3f} ms/page ({len(baseline)} records)")
+
+        for engine in ('js', 'html'):
+            records, ms = time_it(
+                lambda: extract_records(driver, COLUMN_MAPPING, engine), iterations)
+            match = "same records" if records == baseline else "RECORDS DIFFER"
+            print(f"engine={engine:<10} {ms:8.3f} ms/page "
+                  f"({legacy_ms / ms:.1f}x faster, {match})")
+    finally:
+        driver.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--offline', action='store_true',
+                        help="only time local parsing (no Chrome needed)")
+    args = parser.parse_args()
+
+    print(f"Fixture: {os.path.relpath(FIXTURE)}")
+    run_offline(args.iterations)
+    if not args.offline:
+        run_browser(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Normalization benchmark
+Memory of N synthetic scraped rows as the raw text DataFrame downstream
+consumers load today versus the typed frame from ccr_normalize, plus the
+cost of normalizing once and of a typical query (capital above a threshold
+in a date range) on each.
+
+Usage:
+    python benchmarks/bench_normalize.py              # 764,242 rows (the full registry)
+    python benchmarks/bench_normalize.py --rows 200000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+
+from ccr_mock_server import make_record
+from ccr_normalize import CAPITAL_COLUMN, DATE_COLUMN, ascii_digits, normalize_frame
+from scraper_bulk import CCRBulkScraper
+
+COLUMNS = list(CCRBulkScraper.COLUMN_MAPPING.values())
+ARABIC_DIGITS = str.maketrans('0123456789', '٠١٢٣٤٥٦٧٨٩')
+
+
+def raw_frame(count):
+    """Text columns as scraped (object dtype, as pandas 2 loads the xlsx);
+    every fifth row uses Arabic-Indic digits"""
+    rows = []
+    for index in range(count):
+        cells = make_record(index, count) + ["عرض"]
+        if index % 5 == 0:
+            cells = [c.translate(ARABIC_DIGITS) for c in cells]
+        rows.append(cells)
+    return pd.DataFrame(rows, columns=COLUMNS, dtype=object)
+
+
+def query_raw(df):
+    """What a consumer of the text columns has to do for one question"""
+    capital = pd.to_numeric(ascii_digits(df[CAPITAL_COLUMN]), errors='coerce')
+    dates = ascii_digits(df[DATE_COLUMN])
+    return int(((capital > 25000) & (dates >= '2000/01/01') & (dates < '2010/01/01')).sum())
+
+
+def query_typed(df):
+    dates = df[DATE_COLUMN]
+    return int(((df[CAPITAL_COLUMN] > 25000) & (dates >= '2000-01-01') & (dates < '2010-01-01')).sum())
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def frame_mb(df):
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=764_242)
+    args = parser.parse_args()
+
+    raw = raw_frame(args.rows)
+    (typed, rejects), normalize_s = timed(normalize_frame, raw)
+    raw_hits, raw_s = timed(query_raw, raw)
+    typed_hits, typed_s = timed(query_typed, typed)
+    assert raw_hits == typed_hits, (raw_hits, typed_hits)
+
+    print(f"{'frame':<8}{'rows':>12}{'memory MB':>12}{'query s':>10}")
+    print(f"{'raw':<8}{len(raw):>12,}{frame_mb(raw):>12.1f}{raw_s:>10.3f}")
+    print(f"{'typed':<8}{len(typed):>12,}{frame_mb(typed):>12.1f}{typed_s:>10.3f}")
+    print(f"\nNormalizing took {normalize_s:.2f}s ({len(rejects):,} rejected cells); "
+          f"the typed frame is {1 - frame_mb(typed) / frame_mb(raw):.0%} smaller "
+          f"and the query {raw_s / max(typed_s, 1e-9):.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
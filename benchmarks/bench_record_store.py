@@ -0,0 +1,107 @@
+"""
+Record store memory benchmark
+Peak RSS of holding N synthetic scraped rows and turning them into a DataFrame,
+as a list of dicts (the old self.data) versus ccr_store.RecordStore.
+
+Usage:
+    python benchmarks/bench_record_store.py              # 1,000,000 rows
+    python benchmarks/bench_record_store.py --rows 200000
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+if resource is None and psutil is None:
+    import tracemalloc
+    tracemalloc.start()
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ccr_mock_server import make_record
+from scraper_bulk import CCRBulkScraper
+
+COLUMNS = list(CCRBulkScraper.COLUMN_MAPPING.values())
+
+
+def synthetic_rows(count):
+    """Rows as the scraper produces them: fresh string objects for every cell"""
+    for index in range(count):
+        cells = json.loads(json.dumps(make_record(index, count) + ["عرض"]))
+        yield dict(zip(COLUMNS, cells))
+
+
+def peak_rss_mb():
+    """Peak memory of this process: ru_maxrss, else psutil's peak working set
+    (Windows), else the peak of Python allocations from tracemalloc"""
+    if resource is not None:
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+
+
+def measure(mode, rows):
+    start = time.perf_counter()
+    if mode == 'dicts':
+        data = []
+        data.extend(synthetic_rows(rows))
+        df = __import__('pandas').DataFrame(data)
+    else:
+        from ccr_store import RecordStore
+        data = RecordStore(COLUMNS)
+        data.extend(synthetic_rows(rows))
+        df = data.to_dataframe()
+    elapsed = time.perf_counter() - start
+    return {
+        'mode': mode,
+        'rows': len(df),
+        'seconds': round(elapsed, 2),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'dataframe_mb': round(df.memory_usage(deep=True).sum() / (1024 * 1024), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--mode', choices=['dicts', 'store'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.rows)))
+        return
+
+    # Each mode runs in a fresh interpreter so peak RSS is not shared
+    results = []
+    for mode in ('dicts', 'store'):
+        out = subprocess.run([sys.executable, __file__, '--rows', str(args.rows), '--mode', mode],
+                             capture_output=True, text=True, check=True)
+        results.append(json.loads(out.stdout))
+
+    print(f"{'mode':<8}{'rows':>12}{'seconds':>10}{'peak RSS MB':>14}{'DataFrame MB':>15}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['rows']:>12,}{r['seconds']:>10}{r['peak_rss_mb']:>14}{r['dataframe_mb']:>15}")
+    saved = results[0]['peak_rss_mb'] - results[1]['peak_rss_mb']
+    print(f"\nRecordStore saves {saved:.0f} MB peak RSS "
+          f"({saved / results[0]['peak_rss_mb']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
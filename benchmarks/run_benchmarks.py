@@ -0,0 +1,267 @@
+"""
+End-to-end scraper benchmarks against the local mock server
+Runs CCRBulkScraper and CCRScraperFinal on ccr_mock_server and reports
+records/min, p50/p95 per-page latency and peak memory. Results are written
+as JSON under benchmarks/results/ so runs can be compared over time.
+
+Usage:
+    python benchmarks/run_benchmarks.py                            # http backend, both scrapers
+    python benchmarks/run_benchmarks.py --backends http,browser --pages 50 --latency 0.2
+    python benchmarks/run_benchmarks.py --backends browser --profiles default,lean
+    python benchmarks/run_benchmarks.py --compare results/a.json results/b.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+if resource is None and psutil is None:
+    import tracemalloc
+    tracemalloc.start()
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+
+def peak_rss_mb():
+    """Peak memory of this process: ru_maxrss, else psutil's peak working set
+    (Windows), else the peak of Python allocations from tracemalloc"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / (1024 * 1024)
+    return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+
+
+class BrowserMemorySampler:
+    """Samples the summed RSS of this process's children (chromedriver + Chrome)"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+
+    def sample(self):
+        me = psutil.Process()
+        while not self.stop_event.is_set():
+            total = 0
+            for child in me.children(recursive=True):
+                with contextlib.suppress(psutil.Error):
+                    total += child.memory_info().rss
+            self.peak = max(self.peak, total)
+            self.stop_event.wait(self.interval)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop_event.set()
+        self.thread.join()
+
+
+def base_config(args, url, backend, profile='default'):
+    with open(ROOT / 'config.json', 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config['url'] = url
+    config['backend'] = backend
+    config['browser'] = {'profile': profile}
+    config['metrics'] = {'enabled': False}
+    config['pagination']['max_pages'] = args.pages
+    config.setdefault('checkpoint', {})['resume'] = False
+    config['parallel'] = {'workers': 1}
+    return config
+
+
+def instrument(scraper, method_name, marks):
+    """Record a timestamp every time the scraper starts reading a page"""
+    original = getattr(scraper, method_name)
+
+    def timed(*a, **kw):
+        marks.append(time.perf_counter())
+        return original(*a, **kw)
+
+    setattr(scraper, method_name, timed)
+
+
+def run_case(args):
+    """Child process: one scraper/backend combination, printed as JSON"""
+    from ccr_mock_server import MockCCRServer
+
+    scraper_name, backend, profile = args.case.split(':')
+    marks = []
+    with MockCCRServer(records=args.records, rows_per_page=args.rows_per_page,
+                       latency=args.latency, jitter=args.jitter) as server, \
+            tempfile.TemporaryDirectory() as workdir:
+        config = base_config(args, server.url, backend, profile)
+        os.chdir(workdir)
+
+        if scraper_name == 'bulk':
+            from scraper_bulk import CCRBulkScraper
+            scraper = CCRBulkScraper(config)
+            instrument(scraper, 'extract_page_data', marks)
+        else:
+            from scraper_final import CCRScraperFinal
+            scraper = CCRScraperFinal(config)
+            instrument(scraper, 'extract_table_data', marks)
+
+        sampler = BrowserMemorySampler() if psutil and backend == 'browser' else None
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                sampler or contextlib.nullcontext():
+            scraper.run()
+            end = time.perf_counter()
+
+    intervals = [(b - a) * 1000 for a, b in zip(marks, marks[1:])]
+    scrape_seconds = (marks[-1] - start) if marks else 0
+    records = len(scraper.data)
+    return {
+        'scraper': scraper_name,
+        'backend': backend,
+        'profile': profile,
+        'records': records,
+        'pages': len(marks),
+        'startup_s': round(marks[0] - start, 3) if marks else None,
+        'wall_s': round(end - start, 3),
+        'records_per_min': round(records / (scrape_seconds / 60), 1) if scrape_seconds else None,
+        'page_p50_ms': round(percentile(intervals, 50), 1) if intervals else None,
+        'page_p95_ms': round(percentile(intervals, 95), 1) if intervals else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'browser_peak_rss_mb': round(sampler.peak / (1024 * 1024), 1) if sampler else None,
+    }
+
+
+def git_commit():
+    out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                         capture_output=True, text=True)
+    return out.stdout.strip() or None
+
+
+def print_results(results):
+    header = (f"{'scraper':<8}{'backend':<9}{'profile':<9}{'records':>9}{'start s':>9}{'rec/min':>11}"
+              f"{'p50 ms':>9}{'p95 ms':>9}{'RSS MB':>9}{'browser MB':>12}")
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print(f"{r['scraper']:<8}{r['backend']:<9}{r.get('profile', 'default'):<9}{r['records']:>9,}"
+              f"{r['startup_s'] or 0:>9.2f}{r['records_per_min'] or 0:>11,.0f}{r['page_p50_ms'] or 0:>9.1f}"
+              f"{r['page_p95_ms'] or 0:>9.1f}{r['peak_rss_mb']:>9.1f}"
+              f"{r['browser_peak_rss_mb'] if r['browser_peak_rss_mb'] is not None else '-':>12}")
+
+
+def case_key(r):
+    return r['scraper'], r['backend'], r.get('profile', 'default')
+
+
+def compare(old_path, new_path):
+    with open(old_path, encoding='utf-8') as f:
+        old = {case_key(r): r for r in json.load(f)['results']}
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)['results']
+
+    metrics = ['startup_s', 'records_per_min', 'page_p50_ms', 'page_p95_ms',
+               'peak_rss_mb', 'browser_peak_rss_mb']
+    for r in new:
+        before = old.get(case_key(r))
+        if not before:
+            continue
+        changes = []
+        for m in metrics:
+            if before.get(m) and r.get(m) is not None:
+                changes.append(f"{m} {before[m]} -> {r[m]} ({(r[m] - before[m]) / before[m]:+.0%})")
+        print(f"{':'.join(case_key(r))}: " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CCR scraper benchmarks on the mock server")
+    parser.add_argument('--scrapers', default='bulk,final')
+    parser.add_argument('--backends', default='http', help="comma-separated: http,browser")
+    parser.add_argument('--profiles', default='default',
+                        help="browser profiles to run, comma-separated: default,lean")
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--rows-per-page', type=int, default=5)
+    parser.add_argument('--pages', type=int, default=100, help="max_pages per run")
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--output', help="results file (default: benchmarks/results/bench_<time>.json)")
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.case:
+        print(json.dumps(run_case(args)))
+        return
+
+    params = {k: getattr(args, k) for k in
+              ('records', 'rows_per_page', 'pages', 'latency', 'jitter')}
+    # Browser profiles only apply to the browser backend
+    cases = [f"{scraper_name}:{backend}:{profile}"
+             for scraper_name in args.scrapers.split(',')
+             for backend in args.backends.split(',')
+             for profile in (args.profiles.split(',') if backend == 'browser' else ['default'])]
+    results = []
+    for case in cases:
+        print(f"Running {case}...", flush=True)
+        # A fresh interpreter per case keeps peak RSS separate
+        cmd = [sys.executable, __file__, '--case', case]
+        for key, value in params.items():
+            cmd += [f"--{key.replace('_', '-')}", str(value)]
+        out = subprocess.run(cmd, capture_output=True, text=True)
+        if out.returncode != 0:
+            print(f"  ✗ {case} failed:\n{out.stderr.strip()}")
+            continue
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print()
+    print_results(results)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'params': params,
+        'results': results,
+    }
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"\nSaved: {output}")
+
+
+if __name__ == "__main__":
+    main()
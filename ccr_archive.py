@@ -0,0 +1,172 @@
+"""
+Raw page archive for CCR
+Keeps each scraped page's raw table HTML so the dataset can be rebuilt after
+a COLUMN_MAPPING or parsing change without fetching the site again. Pages are
+appended as independent zstd frames to segment files, with a JSONL index of
+where each one starts, so any page can be read back on its own.
+
+Usage:
+    python ccr_archive.py archive/ccr_archive_20251004_144851            # re-parse one run
+    python ccr_archive.py archive/ccr_slice_* --workers 8 --format parquet
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pyarrow as pa
+
+from ccr_table import HEADER_ROWS, parse_table_html, rows_to_records
+
+
+INDEX_NAME = "index.jsonl"
+CHUNK_PAGES = 500  # pages per re-parse task
+
+
+class PageArchive:
+    """Append-only store of raw table HTML, one zstd frame per page
+
+    archive/ccr_archive_20251004_144851/
+        segment_000001.zst
+        segment_000002.zst
+        index.jsonl       {"page", "fetched_at", "segment", "offset", "length", "size"}
+
+    The frame is written before its index line, so a crash can only leave
+    an unindexed tail, which readers never see.
+    """
+
+    def __init__(self, run_dir, segment_mb=64, level=3):
+        self.run_dir = run_dir
+        self.segment_bytes = segment_mb * 1024 * 1024
+        self.codec = pa.Codec('zstd', compression_level=level)
+        os.makedirs(run_dir, exist_ok=True)
+        self.index = open(os.path.join(run_dir, INDEX_NAME), 'a', encoding='utf-8')
+        self.segment = len(glob.glob(os.path.join(run_dir, 'segment_*.zst'))) or 1
+        self.file = open(self.segment_path(self.segment), 'ab')
+
+    @classmethod
+    def create(cls, base_dir='archive', prefix='ccr_archive', **options):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return cls(os.path.join(base_dir, f"{prefix}_{timestamp}"), **options)
+
+    def segment_path(self, segment, run_dir=None):
+        return os.path.join(run_dir or self.run_dir, f"segment_{segment:06d}.zst")
+
+    def append(self, page, html):
+        """Archive one page's table HTML; returns its index entry"""
+        data = html.encode('utf-8')
+        frame = self.codec.compress(data, asbytes=True)
+        if self.file.tell() and self.file.tell() + len(frame) > self.segment_bytes:
+            self.file.close()
+            self.segment += 1
+            self.file = open(self.segment_path(self.segment), 'ab')
+        entry = {'page': page, 'fetched_at': round(time.time(), 3), 'segment': self.segment,
+                 'offset': self.file.tell(), 'length': len(frame), 'size': len(data)}
+        self.file.write(frame)
+        self.file.flush()
+        self.index.write(json.dumps(entry) + '\n')
+        self.index.flush()
+        return entry
+
+    def close(self):
+        self.file.close()
+        self.index.close()
+
+
+def read_index(run_dir):
+    """Index entries of an archive run, in the order the pages were archived"""
+    with open(os.path.join(run_dir, INDEX_NAME), 'r', encoding='utf-8') as f:
+        return [dict(json.loads(line), run_dir=run_dir) for line in f if line.strip()]
+
+
+def read_pages(entries):
+    """Yield (entry, html) for index entries, reading each segment file once"""
+    codec = pa.Codec('zstd')
+    handles = {}
+    try:
+        for entry in entries:
+            path = os.path.join(entry['run_dir'], f"segment_{entry['segment']:06d}.zst")
+            if path not in handles:
+                handles[path] = open(path, 'rb')
+            f = handles[path]
+            f.seek(entry['offset'])
+            data = codec.decompress(f.read(entry['length']), entry['size'], asbytes=True)
+            yield entry, data.decode('utf-8')
+    finally:
+        for f in handles.values():
+            f.close()
+
+
+def parse_chunk(entries, column_mapping):
+    """Worker process: parse archived pages; returns (records, pages, skipped rows)"""
+    records = []
+    skipped = 0
+    for entry, html in read_pages(entries):
+        rows = parse_table_html(html) or []
+        page_records = rows_to_records(rows, column_mapping)
+        skipped += max(0, len(rows) - HEADER_ROWS - len(page_records))
+        records.extend(page_records)
+    return records, len(entries), skipped
+
+
+def reparse(run_dirs, column_mapping, workers=None):
+    """Rebuild records from archive runs across processes; returns (records, pages, skipped)
+
+    Pages are parsed in chunks of CHUNK_PAGES and the results are kept in
+    archive order, so deduplication keeps the same rows a live run would.
+    """
+    entries = [entry for run_dir in run_dirs for entry in read_index(run_dir)]
+    chunks = [entries[i:i + CHUNK_PAGES] for i in range(0, len(entries), CHUNK_PAGES)]
+    records = []
+    pages = skipped = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_records, chunk_pages, chunk_skipped in pool.map(
+                parse_chunk, chunks, [column_mapping] * len(chunks)):
+            records.extend(chunk_records)
+            pages += chunk_pages
+            skipped += chunk_skipped
+    return records, pages, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the dataset from archived pages")
+    parser.add_argument('archives', nargs='+', help="archive run directories")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--workers', type=int, help="parse processes (default: CPU count)")
+    parser.add_argument('--format', help="override output.format")
+    args = parser.parse_args()
+
+    from ccr_dedup import DedupIndex
+    from ccr_output import write_output
+    from ccr_store import RecordStore
+    from scraper_bulk import CCRBulkScraper
+
+    config = CCRBulkScraper(args.config).config
+    output = dict(config.get('output', {}))
+    if args.format:
+        output['format'] = args.format
+
+    start = time.monotonic()
+    records, pages, skipped = reparse(args.archives, CCRBulkScraper.COLUMN_MAPPING, args.workers)
+    unique, duplicates = DedupIndex().filter(records)
+    store = RecordStore(CCRBulkScraper.COLUMN_MAPPING.values())
+    store.extend(unique)
+    elapsed = time.monotonic() - start
+    print(f"✓ Re-parsed {pages:,} pages in {elapsed:.1f}s ({pages / max(elapsed, 1e-9):,.0f} pages/s)")
+    print(f"📊 {len(store):,} unique records, {duplicates:,} duplicates, "
+          f"{skipped:,} table rows skipped by the parse rules")
+    if not store:
+        print("⚠ No data was extracted")
+        return
+
+    stem = f"ccr_reparsed_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    for path in write_output(store, output, stem):
+        print(f"✅ Saved: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Append-only checkpoints for CCR runs
+Each checkpoint writes only the rows added since the previous one as a new
+JSONL segment, so checkpoint cost stays flat however long the run gets.
+"""
+
+import json
+import os
+from datetime import datetime
+
+
+PAGES_NAME = "pages.jsonl"
+
+class CheckpointSink:
+    """Writes checkpoint segments into a run directory
+
+    checkpoints/ccr_checkpoint_20251004_144851/
+        segment_000001_page10.jsonl
+        segment_000002_page20.jsonl
+        ...
+        pages.jsonl     one line per scraped page: rows read, first/last key
+
+    A segment is written to a temp file, fsynced and renamed into place, so a
+    crash leaves either the whole segment or none of it.
+    """
+
+    def __init__(self, run_dir, segments=None):
+        """segments: the segments to continue from (default: every segment in run_dir)"""
+        self.run_dir = run_dir
+        os.makedirs(run_dir, exist_ok=True)
+        if segments is None:
+            segments = sorted(
+                os.path.join(run_dir, name) for name in os.listdir(run_dir)
+                if name.startswith('segment_') and name.endswith('.jsonl'))
+        self.segments = list(segments)
+
+    @classmethod
+    def create(cls, base_dir='checkpoints', prefix='ccr_checkpoint'):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return cls(os.path.join(base_dir, f"{prefix}_{timestamp}"))
+
+    def append(self, records, page):
+        """Write records as the next segment; returns its path (None if nothing to write)"""
+        if not records:
+            return None
+        name = f"segment_{len(self.segments) + 1:06d}_page{page}.jsonl"
+        path = os.path.join(self.run_dir, name)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write('\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.segments.append(path)
+        return path
+
+    @property
+    def pages_path(self):
+        return os.path.join(self.run_dir, PAGES_NAME)
+
+    def append_pages(self, pages):
+        """Append per-page entries ({page, rows, first, last}) to pages.jsonl"""
+        if not pages:
+            return
+        with open(self.pages_path, 'a', encoding='utf-8') as f:
+            for entry in pages:
+                f.write(json.dumps(entry, ensure_ascii=False))
+                f.write('\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def pages(self):
+        """{page: entry} from pages.jsonl; a page scraped again keeps its latest entry"""
+        pages = {}
+        if not os.path.exists(self.pages_path):
+            return pages
+        with open(self.pages_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                pages[entry['page']] = entry
+        return pages
+
+    def records(self):
+        """Iterate over every checkpointed record in write order"""
+        for path in self.segments:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
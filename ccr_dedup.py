@@ -0,0 +1,41 @@
+"""
+Streaming deduplication on registration number
+Duplicate rows are dropped as each page is extracted instead of in one
+pandas pass over the whole dataset.
+"""
+
+
+KEY_COLUMN = "رقم التسجيل"
+
+
+class DedupIndex:
+    """In-memory set of registration numbers already seen"""
+
+    def __init__(self):
+        self.keys = set()
+
+    def add(self, key):
+        """Record key; False if it was already there"""
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        return True
+
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+
+    def filter(self, records):
+        """Return (new records, number of duplicates dropped)"""
+        unique = [r for r in records if self.add(r.get(KEY_COLUMN))]
+        return unique, len(records) - len(unique)
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def close(self):
+        pass
+
@@ -0,0 +1,200 @@
+"""
+Delta refresh for CCR
+Re-scrapes only the front of the registry (newest registrations come first)
+and compares it with the previous dataset: unknown registration numbers are
+inserts, known ones whose status/capital changed are updates. The scrape
+stops after a run of unchanged known companies, or once it reaches pages
+registered before --since. The result is a changeset (JSONL), optionally
+applied to the previous dataset to produce a new full output.
+
+Companies removed from the registry are not detected; run a full scrape
+now and then for that.
+
+Usage:
+    python ccr_delta.py                                   # against the latest output
+    python ccr_delta.py --previous ccr_final_20251004_144851.parquet --apply
+    python ccr_delta.py --since 2025/01/01                # pages registered since a date
+    python ccr_delta.py --mock 520 --revision 1           # against a local mock server
+"""
+
+import argparse
+import copy
+import json
+import os
+from datetime import datetime
+
+from ccr_dedup import KEY_COLUMN
+from ccr_normalize import canonical
+from ccr_output import write_output
+from ccr_store import RecordStore
+from scraper_bulk import CCRBulkScraper
+from view_data import read_records
+
+
+REG_DATE = "تاريخ التسجيل"
+FINGERPRINT_COLUMNS = ["الحالة", "رأس المال الحالي"]
+
+
+def fingerprint(record, columns):
+    # canonical() so a typed (normalized) previous output matches the scraped text
+    return tuple(canonical(record.get(column) or '') for column in columns)
+
+
+def load_index(path, columns=FINGERPRINT_COLUMNS):
+    """{registration number: fingerprint} for the previous dataset"""
+    return {record[KEY_COLUMN]: fingerprint(record, columns)
+            for record in read_records(path) if record.get(KEY_COLUMN)}
+
+
+class DeltaScraper(CCRBulkScraper):
+    """Bulk scraper that classifies rows against a previous dataset as it goes
+
+    config's "delta" section:
+        previous             dataset to compare with (default: the latest output)
+        unchanged_run        stop after this many unchanged known companies in a row
+        since                instead, stop at the first page registered before this date
+        fingerprint_columns  columns whose change makes a company an update
+        apply                also write the previous dataset with the changes applied
+    """
+
+    def __init__(self, config_file='config.json', previous=None):
+        super().__init__(config_file)
+        self.config = copy.deepcopy(self.config)
+        # A delta run always starts from the first page, never from an old checkpoint
+        self.config.setdefault('checkpoint', {})['resume'] = False
+        self.checkpoint_prefix = "ccr_delta"
+        delta = self.config.get('delta', {})
+        self.previous = previous or delta.get('previous')
+        self.unchanged_run = delta.get('unchanged_run', 500)
+        self.since = (delta.get('since') or '').replace('-', '/') or None
+        self.columns = delta.get('fingerprint_columns') or FINGERPRINT_COLUMNS
+        self.apply = delta.get('apply', False)
+        self.index = {}
+        self.changes = []
+        self.unchanged = 0  # unchanged known companies in a row
+
+    def load_previous(self):
+        print(f"📚 Loading previous dataset: {self.previous}")
+        self.index = load_index(self.previous, self.columns)
+        print(f"✓ {len(self.index):,} known companies")
+
+    def store_page(self, page, page_data):
+        before = len(self.data)
+        unique = super().store_page(page, page_data)
+        for record in self.data[before:]:
+            self.classify(record)
+        if self.since and all(str(r.get(REG_DATE) or '').replace('-', '/') < self.since
+                              for r in page_data):
+            print(f"{self.log_prefix}✓ Page {page:,} was registered before {self.since}, stopping")
+            self.stop_requested = True
+        elif not self.since and self.unchanged >= self.unchanged_run:
+            print(f"{self.log_prefix}✓ {self.unchanged:,} unchanged companies in a row, stopping")
+            self.stop_requested = True
+        return unique
+
+    def classify(self, record):
+        key = record.get(KEY_COLUMN)
+        known = self.index.get(key)
+        if known is None:
+            self.changes.append({'op': 'insert', 'key': key, 'record': record})
+            self.unchanged = 0
+            return
+        current = fingerprint(record, self.columns)
+        if current == known:
+            self.unchanged += 1
+            return
+        changed = {column: [old, new] for column, old, new in zip(self.columns, known, current)
+                   if old != new}
+        self.changes.append({'op': 'update', 'key': key, 'record': record, 'changed': changed})
+        self.unchanged = 0
+
+    def save_final(self, pages_scraped, filename_prefix="ccr_final"):
+        """Write the changeset, and with "apply" the updated full dataset"""
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        changes_path = f"ccr_changes_{stamp}.jsonl"
+        with open(changes_path, 'w', encoding='utf-8') as f:
+            for change in self.changes:
+                f.write(json.dumps(change, ensure_ascii=False) + '\n')
+
+        inserts = sum(1 for change in self.changes if change['op'] == 'insert')
+        print("\n" + "="*70)
+        print(f"✅ CHANGESET SAVED: {changes_path}")
+        print(f"➕ Inserts: {inserts:,}")
+        print(f"✏️  Updates: {len(self.changes) - inserts:,}")
+        print(f"📊 Records checked: {len(self.data):,} on {pages_scraped} pages")
+        self.metrics.emit('delta', file=changes_path, inserts=inserts,
+                          updates=len(self.changes) - inserts, checked=len(self.data))
+        if not self.apply:
+            print("="*70 + "\n")
+            return changes_path
+
+        with self.metrics.time('final_save'):
+            paths = write_output(self.apply_changes(), self.config.get('output', {}),
+                                 f"{filename_prefix}_{stamp}")
+        for path in paths:
+            print(f"✅ UPDATED DATASET SAVED: {path}")
+        print("="*70 + "\n")
+        return paths[0]
+
+    def apply_changes(self):
+        """The previous dataset with updated rows replaced and new rows in front"""
+        store = RecordStore(self.COLUMN_MAPPING.values())
+        updates = {}
+        for change in self.changes:
+            if change['op'] == 'insert':
+                store.append(change['record'])
+            else:
+                updates[change['key']] = change['record']
+        for record in read_records(self.previous):
+            store.append(updates.get(record.get(KEY_COLUMN), record))
+        return store
+
+    def run(self):
+        if not self.previous:
+            print("✗ No previous dataset found; run a full scrape first")
+            return
+        self.load_previous()
+        super().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape only what changed since the last output")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--previous', help="dataset to compare with (default: latest output)")
+    parser.add_argument('--since', help="stop at pages registered before this date (YYYY/MM/DD)")
+    parser.add_argument('--unchanged-run', type=int, help="override delta.unchanged_run")
+    parser.add_argument('--apply', action='store_true', help="also write the updated dataset")
+    parser.add_argument('--mock', type=int, metavar='RECORDS',
+                        help="scrape a local mock server with this many records")
+    parser.add_argument('--revision', type=int, default=0,
+                        help="mock revision (changes status/capital of every tenth company)")
+    args = parser.parse_args()
+
+    config = copy.deepcopy(CCRBulkScraper(args.config).config)
+    delta = config.setdefault('delta', {})
+    if args.since:
+        delta['since'] = args.since
+    if args.unchanged_run:
+        delta['unchanged_run'] = args.unchanged_run
+    if args.apply:
+        delta['apply'] = True
+
+    previous = args.previous or delta.get('previous')
+    if not previous:
+        from view_data import find_outputs
+
+        outputs = [path for path in find_outputs() if not os.path.isdir(path)
+                   or not os.path.basename(path).startswith('ccr_checkpoint')]
+        previous = outputs[-1] if outputs else None
+
+    if args.mock:
+        from ccr_mock_server import MockCCRServer
+        with MockCCRServer(records=args.mock, revision=args.revision) as server:
+            config['url'] = server.url
+            DeltaScraper(config, previous).run()
+    else:
+        DeltaScraper(config, previous).run()
+
+
+if __name__ == "__main__":
+    main()
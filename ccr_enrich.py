@@ -0,0 +1,279 @@
+"""
+Company detail enrichment for CCR
+Fetches the detail popup behind each row's "عرض" link (partners, activities,
+capital history) over a pool of HTTP sessions, and keeps the results in an
+SQLite cache keyed by registration number so re-runs only fetch what is
+missing or older than the TTL. Companies whose result page was recorded
+during the scrape are fetched page by page: one seek, then each row's link.
+
+Usage:
+    python ccr_enrich.py ccr_final_20251004_144851.parquet          # enrich an output
+    python ccr_enrich.py ccr_final_*.csv --workers 8 --ttl-days 7
+    python ccr_enrich.py ccr_final_*.parquet --mock                 # against a local mock server
+"""
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ccr_dedup import KEY_COLUMN
+from ccr_http import AdfError, AdfHttpClient, AdfSessionExpired
+from ccr_table import detail_links, parse_detail_html
+
+
+class DetailCache:
+    """Company details keyed by registration number, with a fetch timestamp"""
+
+    def __init__(self, path, ttl_days=30):
+        self.path = path
+        self.ttl = ttl_days * 86400 if ttl_days else None
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS details ("
+                          "key TEXT PRIMARY KEY, fetched_at REAL, data TEXT) WITHOUT ROWID")
+
+    def fresh_keys(self):
+        cutoff = time.time() - self.ttl if self.ttl else 0
+        with self.lock:
+            return {row[0] for row in self.conn.execute(
+                "SELECT key FROM details WHERE fetched_at >= ?", (cutoff,))}
+
+    def missing(self, keys):
+        """Keys with no cached detail, or one older than the TTL (input order kept)"""
+        fresh = self.fresh_keys()
+        return [key for key in dict.fromkeys(keys) if key and key not in fresh]
+
+    def put(self, key, data):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO details VALUES (?, ?, ?)",
+                              (key, time.time(), json.dumps(data, ensure_ascii=False)))
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM details WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM details").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class DetailEnricher:
+    """Fetches missing details with a bounded pool of HTTP sessions
+
+    config is config.json's "enrichment" section:
+        workers     concurrent sessions (default 4)
+        cache       SQLite cache file (default "details_cache.sqlite")
+        ttl_days    cached details older than this are fetched again (default 30)
+    """
+
+    def __init__(self, url, config=None, timeout=15, metrics=None, pacer=None, search=None):
+        config = config or {}
+        self.url = url
+        self.search = search or {}  # the scrape's search filters, which the recorded pages belong to
+        self.timeout = timeout
+        self.workers = config.get('workers', 4)
+        self.cache = DetailCache(config.get('cache', 'details_cache.sqlite'),
+                                 config.get('ttl_days', 30))
+        self.metrics = metrics
+        self.pacer = pacer
+        self.local = threading.local()
+        self.clients = []
+        self.clients_lock = threading.Lock()
+
+    def client(self):
+        """This worker thread's HTTP session"""
+        if getattr(self.local, 'client', None) is None:
+            client = AdfHttpClient(self.url, timeout=self.timeout)
+            client.open()
+            self.local.client = client
+            self.local.searched = False
+            with self.clients_lock:
+                self.clients.append(client)
+        return self.local.client
+
+    def request(self, call, *args, **kwargs):
+        if self.pacer:
+            self.pacer.acquire()
+        return call(*args, **kwargs)
+
+    def fetch(self, key):
+        """Search for one registration number and open its detail popup"""
+        for attempt in range(2):
+            client = self.client()
+            try:
+                self.local.searched = False
+                self.request(client.search, registration_number=key)
+                link = detail_links(client.table_html).get(key)
+                if link is None:
+                    return None
+                return parse_detail_html(self.request(client.detail, link))
+            except AdfSessionExpired:
+                client.open()
+        return None
+
+    def fetch_page(self, page, keys):
+        """{key: detail} for companies scraped from one result page: seek to the
+        page of the scrape's search once and open each row's link. Companies
+        no longer on that page (the registry moved on) are searched for one by one."""
+        details = {}
+        if page is not None:
+            for attempt in range(2):
+                client = self.client()
+                try:
+                    if not self.local.searched:
+                        self.request(client.search, **self.search)
+                        self.local.searched = True
+                    if not self.request(client.goto_page, page):
+                        break
+                    links = detail_links(client.table_html)
+                    for key in keys:
+                        if key in links and key not in details:
+                            details[key] = parse_detail_html(self.request(client.detail, links[key]))
+                    break
+                except AdfSessionExpired:
+                    client.open()
+                    self.local.searched = False
+        for key in keys:
+            if key not in details:
+                details[key] = self.fetch(key)
+        return details
+
+    def enrich(self, keys, pages=None):
+        """Fetch every key missing from the cache; returns (fetched, cached, failed)
+
+        pages maps registration numbers to the result page (of the search in
+        self.search) they were scraped from; those are fetched a page at a
+        time, the rest with one search each.
+        """
+        keys = [key for key in dict.fromkeys(keys) if key]
+        todo = self.cache.missing(keys)
+        cached = len(keys) - len(todo)
+        print(f"🔎 Details: {cached:,} cached, {len(todo):,} to fetch with {self.workers} workers")
+
+        by_page, single = {}, []
+        for key in todo:
+            page = (pages or {}).get(key)
+            if page is None:
+                single.append((None, [key]))
+            else:
+                by_page.setdefault(page, []).append(key)
+
+        fetched = failed = 0
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {}
+            queue = iter(list(by_page.items()) + single)
+            while True:
+                # Keep at most 2 pages (or lookups) per worker in flight
+                for page, batch in queue:
+                    pending[pool.submit(self.timed_fetch, page, batch)] = batch
+                    if len(pending) >= 2 * self.workers:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = pending.pop(future)
+                    try:
+                        details = future.result()
+                    except (AdfError, OSError) as e:
+                        details = {}
+                        print(f"✗ Details {batch[0]}{'...' if len(batch) > 1 else ''}: {e}")
+                        if self.pacer:
+                            self.pacer.failure('error')
+                    for key in batch:
+                        if details.get(key):
+                            self.cache.put(key, details[key])
+                            fetched += 1
+                        else:
+                            failed += 1
+                        if (fetched + failed) % 100 == 0:
+                            rate = (fetched + failed) / max(time.monotonic() - start, 1e-9) * 60
+                            print(f"   {fetched + failed:,}/{len(todo):,} details ({rate:,.0f}/min)")
+
+        if self.metrics:
+            self.metrics.inc('details_fetched', fetched)
+            self.metrics.inc('details_cached', cached)
+            self.metrics.inc('details_failed', failed)
+        print(f"✓ Details fetched: {fetched:,}, failed: {failed:,}")
+        return fetched, cached, failed
+
+    def timed_fetch(self, page, keys):
+        if self.metrics is None:
+            return self.fetch_page(page, keys)
+        with self.metrics.time('detail'):
+            return self.fetch_page(page, keys)
+
+    def export(self, keys, path):
+        """Write the cached details of keys as JSONL; returns the number written"""
+        written = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            for key in dict.fromkeys(keys):
+                detail = self.cache.get(key)
+                if detail is not None:
+                    f.write(json.dumps({KEY_COLUMN: key, **detail}, ensure_ascii=False) + '\n')
+                    written += 1
+        return written
+
+    def close(self):
+        for client in self.clients:
+            client.close()
+        self.cache.close()
+
+
+def read_keys(path):
+    """Registration numbers from a scraper output (anything view_data can open)"""
+    from view_data import open_dataset
+
+    table = open_dataset(path).to_table(columns=[KEY_COLUMN])
+    return [str(key) for key in table.column(KEY_COLUMN).to_pylist()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch company details for a scraper output")
+    parser.add_argument('path', help="output file or directory with a رقم التسجيل column")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--workers', type=int, help="override enrichment.workers")
+    parser.add_argument('--ttl-days', type=float, help="override enrichment.ttl_days")
+    parser.add_argument('--output', help="details JSONL (default: <output>_details.jsonl)")
+    parser.add_argument('--mock', action='store_true', help="use a local mock server")
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    enrichment = dict(config.get('enrichment', {}))
+    if args.workers:
+        enrichment['workers'] = args.workers
+    if args.ttl_days is not None:
+        enrichment['ttl_days'] = args.ttl_days
+
+    keys = read_keys(args.path)
+    output = args.output or args.path.rsplit('.', 1)[0] + '_details.jsonl'
+
+    def run(url):
+        enricher = DetailEnricher(url, enrichment, timeout=config.get('wait_timeout', 15))
+        try:
+            enricher.enrich(keys)
+            print(f"💾 {enricher.export(keys, output):,} details saved: {output}")
+        finally:
+            enricher.close()
+
+    if args.mock:
+        from ccr_mock_server import BASE_NUMBER, MockCCRServer
+        numbers = [int(k) for k in keys if k.isdigit()]
+        with MockCCRServer(records=max(numbers) - BASE_NUMBER if numbers else 1000) as server:
+            run(server.url)
+    else:
+        run(config['url'])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""
+Browserless backend for CCR
+Replays the ADF search and pagination events over a keep-alive HTTP session
+and reads the results table straight from the partial-response XML.
+With fetch_pages above 1 each table request asks for several pages of rows
+at once (ADF rangeSize) and the pages are then served from that block.
+"""
+
+import copy
+import re
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin
+
+import requests
+from lxml import html as lxml_html
+
+from ccr_navigation import parse_pagination_text
+from ccr_table import (DETAIL_ID, HEADER_ROWS, INVALID_KEYS, MIN_CELLS, NEXT_BUTTON_ID,
+                       SEARCH_BUTTON_ID, SEARCH_FIELDS, TABLE_ID, parse_table_html,
+                       rows_to_records)
+
+
+VIEW_STATE = "javax.faces.ViewState"
+AFR_LOOP = re.compile(r'_afrLoop=(\d+)')
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/120.0 Safari/537.36")
+
+
+class AdfError(Exception):
+    """The server answered an ADF event with an error"""
+
+
+class AdfSessionExpired(AdfError):
+    """The JSF view or HTTP session is gone; open() and search again"""
+
+
+def event_message(params):
+    """Encode event parameters the way the ADF client does"""
+    parts = []
+    for name, value in params.items():
+        tag = 'n' if isinstance(value, int) else 's'
+        parts.append(f'<k v="{name}"><{tag}>{value}</{tag}></k>')
+    return '<m xmlns="http://oracle.com/richClient/comm">' + ''.join(parts) + '</m>'
+
+
+def parse_partial_response(text):
+    """Return {component id: html} from an ADF/JSF partial-response
+
+    Raises AdfSessionExpired / AdfError when the response carries an error.
+    """
+    root = ET.fromstring(text.strip().encode('utf-8'))
+    error = root.find('.//error')
+    if error is not None:
+        name = error.findtext('error-name') or ''
+        message = error.findtext('error-message') or name
+        if 'ViewExpired' in name:
+            raise AdfSessionExpired(message)
+        raise AdfError(message)
+    return {update.get('id'): update.text or '' for update in root.iter('update')}
+
+
+class AdfHttpClient:
+    """Drives the CCR search over plain HTTP instead of a browser"""
+
+    def __init__(self, url, timeout=15, pool_size=4, fetch_pages=1):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size,
+                                                pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+        self.action = url
+        self.form = {}
+        self.table_html = None
+        self.range_size = None  # rows per page of the plain search
+        self.total_pages = None
+        self.fetch_pages = fetch_pages
+        # With fetch_pages > 1: the fetched table, its first page and the page shown
+        self.block = None
+        self.block_page = None
+        self.offset = 0
+
+    def open(self):
+        """Load the HomePage and capture the form action, hidden fields and ViewState"""
+        response = self.session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+
+        # ADF answers the very first request with a window-id loopback page
+        loop = AFR_LOOP.search(response.text)
+        if loop and VIEW_STATE not in response.text:
+            response = self.session.get(self.url, timeout=self.timeout, params={
+                '_afrLoop': loop.group(1), '_afrWindowMode': 0, 'Adf-Window-Id': 'w0'})
+            response.raise_for_status()
+
+        page = lxml_html.fromstring(response.text)
+        forms = page.xpath('//form[.//input[@name=$name]]', name=VIEW_STATE)
+        if not forms:
+            raise AdfError("HomePage has no JSF form")
+        form = forms[0]
+        self.action = urljoin(response.url, form.get('action') or response.url)
+        self.form = {i.get('name'): i.get('value', '')
+                     for i in form.xpath('.//input[@type="hidden"][@name]')}
+        self.table_html = None
+        self.block = None
+
+    def fire(self, source, **params):
+        """Send one ADF event and return the partial-response updates"""
+        data = dict(self.form)
+        data['event'] = source
+        data[f'event.{source}'] = event_message(params or {'type': 'action'})
+        data['oracle.adf.view.rich.PROCESS'] = source
+        response = self.session.post(self.action, data=data, timeout=self.timeout,
+                                     headers={'Adf-Rich-Message': 'true'})
+        response.raise_for_status()
+
+        updates = parse_partial_response(response.text)
+        if VIEW_STATE in updates:
+            self.form[VIEW_STATE] = updates.pop(VIEW_STATE)
+        for content in updates.values():
+            if TABLE_ID in content:
+                self.table_html = content
+        return updates
+
+    def search(self, **filters):
+        """Click the search button; with no filters this lists the whole registry
+
+        filters are config.json "search_params" keys, e.g. registration_number='1234'.
+        """
+        for name, value in filters.items():
+            self.form[SEARCH_FIELDS[name]] = value or ''
+        self.block = None
+        self.fire(SEARCH_BUTTON_ID)
+        # A filtered search can return less than one full page
+        self.range_size = max(self.range_size or 0, len(self.rows()) - HEADER_ROWS) or None
+        self.total_pages = self.pagination()[1]
+        if self.fetch_pages > 1 and self.range_size and (self.total_pages or 0) > 1:
+            self.negotiate_fetch_size()
+        return self.table_html is not None
+
+    def negotiate_fetch_size(self):
+        """Ask for fetch_pages pages per request, settling for what the server allows"""
+        size = self.range_size * self.fetch_pages
+        self.fire(TABLE_ID, type='rangeChange', newStart=0, rangeSize=size)
+        fetched = len(self.rows()) - HEADER_ROWS
+        if fetched < size and fetched < self.total_pages * self.range_size:
+            # The server caps the range (or ignores rangeSize): use whole pages of what it sent
+            self.fetch_pages = max(1, fetched // self.range_size)
+            if self.fetch_pages == 1:
+                self.fire(TABLE_ID, type='rangeChange', newStart=0, rangeSize=self.range_size)
+                return
+            self.fire(TABLE_ID, type='rangeChange', newStart=0,
+                      rangeSize=self.range_size * self.fetch_pages)
+        self.show_block(1)
+
+    def show_block(self, first_page):
+        """Keep the table just fetched as the block starting at first_page and show its first page"""
+        self.block = lxml_html.fromstring(self.table_html)
+        self.block_page = first_page
+        self.show(first_page)
+
+    def block_pages(self):
+        rows = len(self.block.xpath('//tr')) - HEADER_ROWS
+        return max(0, -(-rows // self.range_size))
+
+    def show(self, page):
+        """Point table_html at one page's rows of the block"""
+        self.offset = page - self.block_page
+        table = copy.deepcopy(self.block)
+        rows = table.xpath('//tr')[HEADER_ROWS:]
+        first = self.offset * self.range_size
+        for row in rows[:first] + rows[first + self.range_size:]:
+            row.getparent().remove(row)
+        self.table_html = lxml_html.tostring(table, encoding='unicode')
+
+    def detail(self, link_id):
+        """Open a row's detail popup; returns its HTML, or None"""
+        return self.fire(link_id).get(DETAIL_ID)
+
+    def rows(self):
+        return parse_table_html(self.table_html) or []
+
+    def extract_records(self, column_mapping):
+        return rows_to_records(self.rows(), column_mapping)
+
+    def pagination(self):
+        """(current page, total pages) from the last table render"""
+        if self.block is not None:
+            return self.block_page + self.offset, self.total_pages
+        if not self.table_html:
+            return None, None
+        text = lxml_html.fromstring(self.table_html).text_content()
+        return parse_pagination_text(text)
+
+    def server_page(self):
+        """Page number the server's indicator shows (for a block, the block's number)"""
+        root = self.block if self.block is not None else lxml_html.fromstring(self.table_html)
+        return parse_pagination_text(root.text_content())[0]
+
+    @property
+    def next_buffered(self):
+        """True when the next page is already in the fetched block (no request needed)"""
+        return self.block is not None and self.offset + 1 < self.block_pages()
+
+    def has_next(self):
+        if self.next_buffered:
+            return True
+        if self.block is not None:
+            root = self.block
+        elif self.table_html:
+            root = lxml_html.fromstring(self.table_html)
+        else:
+            return False
+        found = root.xpath('//*[@id=$id]', id=NEXT_BUTTON_ID)
+        return bool(found) and 'p_AFDisabled' not in (found[0].get('class') or '')
+
+    def next_page(self):
+        """Fire the next-page event; True if the table moved on"""
+        if not self.has_next():
+            return False
+        if self.next_buffered:
+            self.show(self.block_page + self.offset + 1)
+            return True
+        if self.block is not None:
+            # The server moves on by its range size, i.e. one whole block
+            before = self.server_page()
+            self.fire(NEXT_BUTTON_ID)
+            block = lxml_html.fromstring(self.table_html)
+            if parse_pagination_text(block.text_content())[0] != before + 1:
+                self.show(self.block_page + self.offset)
+                return False
+            self.show_block(self.block_page + self.fetch_pages)
+            return True
+        before, _ = self.pagination()
+        self.fire(NEXT_BUTTON_ID)
+        after, _ = self.pagination()
+        return after is not None and after != before
+
+    def goto_page(self, page, reload=False):
+        """Jump straight to a page with a table range change event
+
+        Confirms the page against the table's "الصفحة N" indicator; with
+        reload the current page is requested again.
+        """
+        current, total = self.pagination()
+        if current == page and not reload:
+            return True
+        if total and page > total:
+            return False
+        if self.block is not None:
+            return self.goto_block_page(page, reload)
+        if self.range_size:
+            self.fire(TABLE_ID, type='rangeChange', newStart=(page - 1) * self.range_size)
+            current, _ = self.pagination()
+        while current is not None and current < page and self.next_page():
+            current, _ = self.pagination()
+        return current == page
+
+    def goto_block_page(self, page, reload=False):
+        """goto_page with fetch_pages > 1: fetch the block holding page unless it is loaded"""
+        index = (page - 1) // self.fetch_pages
+        first = index * self.fetch_pages + 1
+        if first != self.block_page or reload:
+            size = self.range_size * self.fetch_pages
+            self.fire(TABLE_ID, type='rangeChange', newStart=index * size, rangeSize=size)
+            block = lxml_html.fromstring(self.table_html)
+            if parse_pagination_text(block.text_content())[0] != index + 1:
+                self.show(self.block_page + self.offset)
+                return False
+            self.block = block
+            self.block_page = first
+        if page - first >= self.block_pages():
+            return False
+        self.show(page)
+        return True
+
+    def close(self):
+        self.session.close()
+
+
+class HttpReadiness:
+    """PageReadiness counterpart for the HTTP backend
+
+    Every event response already holds the new table, so there is nothing to wait for.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.timings = []
+
+    def fingerprint(self):
+        """(first key, last key, row count) of the current table, like PageReadiness"""
+        keys = [cells[0] for cells in self.client.rows()[HEADER_ROWS:]
+                if len(cells) >= MIN_CELLS and cells[0] not in INVALID_KEYS]
+        return (keys[0], keys[-1], len(keys)) if keys else None
+
+    def wait(self, label, previous=None, require_rows=True):
+        return True
+
+    def wait_for_document(self, label='load'):
+        return True
+
+    def summary(self):
+        return {}
+
+    def print_summary(self):
+        pass
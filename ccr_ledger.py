@@ -0,0 +1,448 @@
+"""
+Distributed work ledger for CCR
+A shared SQLite file of work units (page ranges or partition slices) that
+any number of workers, on one machine or several sharing the file, claim
+under a lease, keep alive with heartbeats and commit whole: a unit's rows
+and its "done" state are written in one transaction. A lease that is not
+renewed expires and the unit goes to the next worker that asks, up to
+max_attempts tries. merge writes the final output, deduplicated on
+رقم التسجيل.
+
+SQLite needs working file locks, so the ledger file must be on a local
+disk or a network filesystem that supports them.
+
+Usage:
+    python ccr_ledger.py plan                      # split the results into page units
+    python ccr_ledger.py plan --partitions         # or into prefix slices (ccr_partition)
+    python ccr_ledger.py work                      # on every node, as often as wanted
+    python ccr_ledger.py status
+    python ccr_ledger.py retry                     # failed units back to pending
+    python ccr_ledger.py merge
+    python ccr_ledger.py local --workers 3 --mock 2000   # all of it against a local mock
+"""
+
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from ccr_dedup import KEY_COLUMN, DedupIndex
+from scraper_bulk import CCRBulkScraper
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    seq INTEGER PRIMARY KEY,
+    id TEXT UNIQUE,
+    spec TEXT,
+    state TEXT DEFAULT 'pending',   -- pending | leased | done | failed
+    owner TEXT,
+    lease_until REAL,
+    heartbeat_at REAL,
+    attempts INTEGER DEFAULT 0,
+    records INTEGER,
+    error TEXT,
+    done_at REAL
+);
+CREATE TABLE IF NOT EXISTS results (
+    seq INTEGER PRIMARY KEY,
+    unit TEXT,
+    key TEXT,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS results_unit ON results (unit);
+"""
+
+
+class WorkLedger:
+    """Units of work with lease / heartbeat / retry state in an SQLite file
+
+    Every call opens its own connection, so one ledger object can be used
+    from a worker's scrape thread and its heartbeat thread alike.
+    """
+
+    def __init__(self, path, max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        conn = self.connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def transaction(self, conn):
+        # IMMEDIATE takes the write lock up front, so two workers can never
+        # read the same pending unit and both claim it
+        conn.execute("BEGIN IMMEDIATE")
+
+    def plan(self, units):
+        """Add units ({'id', ...spec}) not already in the ledger; returns how many were added"""
+        conn = self.connect()
+        try:
+            self.transaction(conn)
+            added = 0
+            for unit in units:
+                spec = {k: v for k, v in unit.items() if k != 'id'}
+                cursor = conn.execute("INSERT OR IGNORE INTO units (id, spec) VALUES (?, ?)",
+                                      (unit['id'], json.dumps(spec, ensure_ascii=False)))
+                added += cursor.rowcount
+            conn.execute("COMMIT")
+            return added
+        finally:
+            conn.close()
+
+    def claim(self, owner, lease_seconds):
+        """Lease the next pending (or expired) unit to owner; returns it or None"""
+        conn = self.connect()
+        try:
+            self.transaction(conn)
+            now = time.time()
+            # Expired leases that used up their attempts are given up on
+            conn.execute("UPDATE units SET state = 'failed', "
+                         "error = coalesce(error, 'lease expired') "
+                         "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                         (now, self.max_attempts))
+            row = conn.execute(
+                "SELECT * FROM units WHERE state = 'pending' "
+                "OR (state = 'leased' AND lease_until < ?) ORDER BY seq LIMIT 1", (now,)).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute("UPDATE units SET state = 'leased', owner = ?, lease_until = ?, "
+                         "heartbeat_at = ?, attempts = attempts + 1 WHERE id = ?",
+                         (owner, now + lease_seconds, now, row['id']))
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+        unit = json.loads(row['spec'])
+        unit.update(id=row['id'], attempt=row['attempts'] + 1,
+                    reclaimed=row['state'] == 'leased')
+        return unit
+
+    def heartbeat(self, unit_id, owner, lease_seconds):
+        """Extend the lease; False if owner no longer holds it"""
+        conn = self.connect()
+        try:
+            now = time.time()
+            cursor = conn.execute(
+                "UPDATE units SET lease_until = ?, heartbeat_at = ? "
+                "WHERE id = ? AND owner = ? AND state = 'leased' AND lease_until >= ?",
+                (now + lease_seconds, now, unit_id, owner, now))
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def complete(self, unit_id, owner, records):
+        """Store a unit's rows and mark it done in one transaction
+
+        Returns False (and stores nothing) if the lease was lost meanwhile.
+        """
+        conn = self.connect()
+        try:
+            self.transaction(conn)
+            held = conn.execute("SELECT 1 FROM units "
+                                "WHERE id = ? AND owner = ? AND state = 'leased'",
+                                (unit_id, owner)).fetchone()
+            if not held:
+                conn.execute("ROLLBACK")
+                return False
+            conn.executemany("INSERT INTO results (unit, key, data) VALUES (?, ?, ?)",
+                             ((unit_id, record.get(KEY_COLUMN),
+                               json.dumps(record, ensure_ascii=False)) for record in records))
+            conn.execute("UPDATE units SET state = 'done', records = ?, done_at = ?, error = NULL "
+                         "WHERE id = ?", (len(records), time.time(), unit_id))
+            conn.execute("COMMIT")
+            return True
+        finally:
+            conn.close()
+
+    def fail(self, unit_id, owner, error):
+        """Release a unit after an error: back to pending, or failed after max_attempts"""
+        conn = self.connect()
+        try:
+            conn.execute(
+                "UPDATE units SET "
+                "state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "owner = NULL, lease_until = NULL, error = ? WHERE id = ? AND owner = ?",
+                (self.max_attempts, str(error)[:500], unit_id, owner))
+        finally:
+            conn.close()
+
+    def status(self):
+        """{state: count}"""
+        conn = self.connect()
+        try:
+            return {row[0]: row[1] for row in conn.execute(
+                "SELECT state, COUNT(*) FROM units GROUP BY state")}
+        finally:
+            conn.close()
+
+    def done_pages(self):
+        """Result pages covered by the units that are done"""
+        conn = self.connect()
+        try:
+            specs = [json.loads(row[0]) for row in conn.execute(
+                "SELECT spec FROM units WHERE state = 'done'")]
+        finally:
+            conn.close()
+        return sum(spec['pages'] if 'pages' in spec else spec['end'] - spec['start'] + 1
+                   for spec in specs)
+
+    def open_units(self):
+        """Units still pending or leased (expired leases included)"""
+        status = self.status()
+        return status.get('pending', 0) + status.get('leased', 0)
+
+    def records(self):
+        """Committed rows in unit order"""
+        conn = self.connect()
+        try:
+            for row in conn.execute("SELECT r.data FROM results r JOIN units u ON u.id = r.unit "
+                                    "ORDER BY u.seq, r.seq"):
+                yield json.loads(row[0])
+        finally:
+            conn.close()
+
+
+def open_ledger(config):
+    """The WorkLedger of config.json's "ledger" section"""
+    ledger = config.get('ledger', {})
+    return WorkLedger(ledger.get('path', os.path.join('checkpoints', 'ccr_ledger.sqlite')),
+                      ledger.get('max_attempts', 3))
+
+
+def page_units(total_pages, unit_pages):
+    """Page ranges of unit_pages pages covering 1..total_pages"""
+    return [{'id': f"pages_{start}", 'start': start,
+             'end': min(start + unit_pages - 1, total_pages)}
+            for start in range(1, total_pages + 1, unit_pages)]
+
+
+class LeaseKeeper(threading.Thread):
+    """Renews a unit's lease in the background; stops the scraper if it is lost"""
+
+    def __init__(self, ledger, unit_id, owner, lease_seconds, scraper):
+        super().__init__(name='ccr-lease', daemon=True)
+        self.ledger = ledger
+        self.unit_id = unit_id
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.scraper = scraper
+        self.done = threading.Event()
+        self.lost = False
+
+    def run(self):
+        while not self.done.wait(self.lease_seconds / 3):
+            if not self.ledger.heartbeat(self.unit_id, self.owner, self.lease_seconds):
+                print(f"{self.scraper.log_prefix}⚠️  Lease on {self.unit_id} lost, stopping")
+                self.lost = True
+                self.scraper.stop_requested = True
+                return
+
+
+def scrape_unit(config, unit, log_prefix, keeper_factory):
+    """Scrape one unit with a fresh session; returns (records, complete)"""
+    config = copy.deepcopy(config)
+    if 'search_params' in unit:
+        config['search_params'] = {**config.get('search_params', {}), **unit['search_params']}
+        start, end = 1, unit['pages']
+    else:
+        start, end = unit['start'], unit['end']
+    # Units are committed whole to the ledger, so no per-page checkpoint files
+    config.setdefault('checkpoint', {})['interval'] = 10 ** 9
+
+    scraper = CCRBulkScraper(config)
+    scraper.log_prefix = log_prefix
+    keeper = keeper_factory(scraper)
+    keeper.start()
+    try:
+        scraper.setup_backend()
+        scraper.navigate_and_search()
+        if start > 1 and not scraper.goto_page(start):
+            raise RuntimeError(f"could not reach page {start}")
+        scraper.open_dedup_index()
+        scraper.scrape(start, end)
+        complete = not keeper.lost and (scraper.completed_page >= end or scraper.is_last_page())
+        return list(scraper.data), complete
+    finally:
+        keeper.done.set()
+        scraper.close()
+
+
+def run_worker(config, owner=None):
+    """Claim and scrape units until none are left; returns the number completed"""
+    ledger = open_ledger(config)
+    lease_seconds = config.get('ledger', {}).get('lease_seconds', 120)
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+    log_prefix = f"[{owner}] "
+    completed = 0
+    while True:
+        unit = ledger.claim(owner, lease_seconds)
+        if unit is None:
+            if not ledger.open_units():
+                break
+            # Units leased by others: wait in case a lease expires and needs taking over
+            time.sleep(min(lease_seconds / 4, 10))
+            continue
+
+        note = " (reclaimed)" if unit['reclaimed'] else ""
+        print(f"{log_prefix}▶ {unit['id']}, attempt {unit['attempt']}{note}", flush=True)
+        try:
+            records, complete = scrape_unit(
+                config, unit, log_prefix,
+                lambda scraper: LeaseKeeper(ledger, unit['id'], owner, lease_seconds, scraper))
+        except Exception as e:
+            print(f"{log_prefix}✗ {unit['id']}: {e}", flush=True)
+            ledger.fail(unit['id'], owner, e)
+            continue
+        if not complete:
+            ledger.fail(unit['id'], owner, "stopped before the last page of the unit")
+        elif ledger.complete(unit['id'], owner, records):
+            completed += 1
+            print(f"{log_prefix}✓ {unit['id']}: {len(records):,} records", flush=True)
+        else:
+            print(f"{log_prefix}⚠️  {unit['id']} was taken over by another worker; "
+                  f"discarding {len(records):,} records", flush=True)
+    return completed
+
+
+class LedgerScraper:
+    """Plans, runs and merges a ledger-coordinated scrape"""
+
+    def __init__(self, config):
+        self.config = config
+        self.unit_pages = config.get('ledger', {}).get('unit_pages', 100)
+        self.ledger = open_ledger(config)
+        self.start_time = datetime.now()
+
+    def plan(self, partitions=False):
+        probe = CCRBulkScraper(copy.deepcopy(self.config))
+        try:
+            probe.setup_backend()
+            probe.navigate_and_search()
+            if partitions:
+                from ccr_partition import plan_partitions
+
+                partition = self.config.get('partition', {})
+                slices = plan_partitions(probe, partition.get('max_slice_pages', 2000),
+                                         partition.get('prefixes') or list("123456789"))
+                units = [{'id': s['name'], 'search_params': s['search_params'], 'pages': s['pages']}
+                         for s in slices]
+            else:
+                total_pages = min(probe.get_pagination_info() or 1,
+                                  self.config['pagination']['max_pages'])
+                units = page_units(total_pages, self.unit_pages)
+        finally:
+            probe.close()
+        added = self.ledger.plan(units)
+        print(f"✓ Ledger {self.ledger.path}: {added} units added, "
+              f"{len(units) - added} already planned")
+        return added
+
+    def print_status(self):
+        status = self.ledger.status()
+        print(f"📋 {self.ledger.path}: " + ", ".join(
+            f"{state} {count}" for state, count in sorted(status.items())))
+        return status
+
+    def merge(self):
+        """Write the committed rows as the final output, deduplicated on registration number"""
+        index = DedupIndex()
+        writer = CCRBulkScraper(self.config)
+        total = 0
+        batch = []
+        for record in self.ledger.records():
+            batch.append(record)
+            if len(batch) >= 10000:
+                writer.data.extend(index.filter(batch)[0])
+                total += len(batch)
+                batch = []
+        writer.data.extend(index.filter(batch)[0])
+        total += len(batch)
+        if not writer.data:
+            print("\n⚠ No data was extracted")
+            return None
+        status = self.print_status()
+        if status.get('pending') or status.get('leased') or status.get('failed'):
+            print("⚠️  Some units are not done; run workers again ('retry' for failed units)")
+        writer.duplicate_count = total - len(writer.data)
+        writer.start_time = self.start_time
+        return writer.save_final(self.ledger.done_pages())
+
+    def retry_failed(self):
+        conn = self.ledger.connect()
+        try:
+            cursor = conn.execute("UPDATE units SET state = 'pending', attempts = 0 "
+                                  "WHERE state = 'failed'")
+            print(f"↩️  {cursor.rowcount} failed units back to pending")
+        finally:
+            conn.close()
+
+
+def local_worker(config, number):
+    return run_worker(config, owner=f"{socket.gethostname()}:w{number}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ledger-coordinated (multi-node) scraping")
+    parser.add_argument('command', choices=['plan', 'work', 'status', 'retry', 'merge', 'local'])
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--ledger', help="override ledger.path")
+    parser.add_argument('--partitions', action='store_true',
+                        help="plan/local: prefix slices instead of page ranges")
+    parser.add_argument('--owner', help="work: worker name (default: host:pid)")
+    parser.add_argument('--workers', type=int, default=2, help="local: worker processes")
+    parser.add_argument('--mock', type=int, metavar='RECORDS',
+                        help="local: run against a local mock server with this many records")
+    args = parser.parse_args()
+
+    config = copy.deepcopy(CCRBulkScraper(args.config).config)
+    if args.ledger:
+        config.setdefault('ledger', {})['path'] = args.ledger
+
+    def run():
+        scraper = LedgerScraper(config)
+        if args.command == 'plan':
+            scraper.plan(args.partitions)
+        elif args.command == 'work':
+            print(f"✓ {run_worker(config, args.owner)} units completed")
+        elif args.command == 'status':
+            scraper.print_status()
+        elif args.command == 'retry':
+            scraper.retry_failed()
+        elif args.command == 'merge':
+            scraper.merge()
+        else:
+            scraper.plan(args.partitions)
+            workers = [multiprocessing.Process(target=local_worker, args=(config, n))
+                       for n in range(1, args.workers + 1)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            scraper.merge()
+
+    if args.mock:
+        from ccr_mock_server import MockCCRServer
+        with MockCCRServer(records=args.mock) as server:
+            config['url'] = server.url
+            run()
+    else:
+        run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Run manifest for CCR checkpoints
+Records how far a run got so an interrupted run can pick up where it stopped
+"""
+
+import glob
+import json
+import os
+from datetime import datetime
+
+
+MANIFEST_NAME = "manifest.json"
+
+
+class RunManifest:
+    """State of one run, stored as manifest.json next to its checkpoint segments
+
+    page            last page whose rows are in the segments
+    record_count    rows written to the segments so far
+    fingerprint     [first, last] registration number on that page
+    segments        segment files, in write order
+    status          running | interrupted | error | stopped | complete
+                    (stopped: the scrape gave up before its last page)
+    total_pages     result pages the search reported (latest search)
+    start_page      first page the run scraped (a parallel worker's shard start)
+    end_page        last page the run was asked for (its shard end, or max_pages)
+    """
+
+    def __init__(self, run_dir, page=0, record_count=0, fingerprint=None,
+                 segments=None, status='running', started_at=None, updated_at=None,
+                 total_pages=None, start_page=None, end_page=None):
+        self.run_dir = run_dir
+        self.page = page
+        self.record_count = record_count
+        self.fingerprint = fingerprint
+        self.segments = segments or []
+        self.status = status
+        self.total_pages = total_pages
+        self.start_page = start_page
+        self.end_page = end_page
+        self.started_at = started_at or datetime.now().isoformat(timespec='seconds')
+        self.updated_at = updated_at
+
+    @property
+    def path(self):
+        return os.path.join(self.run_dir, MANIFEST_NAME)
+
+    def to_dict(self):
+        return {
+            'page': self.page,
+            'record_count': self.record_count,
+            'fingerprint': self.fingerprint,
+            'segments': [os.path.basename(s) for s in self.segments],
+            'status': self.status,
+            'total_pages': self.total_pages,
+            'start_page': self.start_page,
+            'end_page': self.end_page,
+            'started_at': self.started_at,
+            'updated_at': self.updated_at,
+        }
+
+    def save(self):
+        """Atomically replace manifest.json"""
+        self.updated_at = datetime.now().isoformat(timespec='seconds')
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def load(cls, run_dir):
+        with open(os.path.join(run_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        data['segments'] = [os.path.join(run_dir, s) for s in data.get('segments', [])]
+        return cls(run_dir, **data)
+
+    @classmethod
+    def find_resumable(cls, base_dir='checkpoints', prefix='ccr_checkpoint'):
+        """The most recent run under base_dir that did not complete, or None"""
+        paths = glob.glob(os.path.join(base_dir, f"{prefix}_[0-9]*", MANIFEST_NAME))
+        for path in sorted(paths, reverse=True):
+            manifest = cls.load(os.path.dirname(path))
+            if manifest.status != 'complete' and manifest.page > 0:
+                return manifest
+        return None
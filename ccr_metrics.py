@@ -0,0 +1,202 @@
+"""
+Run metrics for CCR scrapers
+Per-stage timing histograms, counters and a rolling throughput figure,
+written as JSONL events and optionally served as Prometheus text.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+RECENT = 1000  # observations kept per histogram for percentiles
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RECENT)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+
+    def percentile(self, pct):
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+class Metrics:
+    """Collects stage timings and counters for one scraper run"""
+
+    def __init__(self, path=None, throughput_window=300):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.window = throughput_window
+        self.row_times = deque()
+        self.started = time.monotonic()
+        self.file = None
+        self.server = None
+        if path:
+            self.open(path)
+
+    def open(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8')
+        self.path = path
+
+    def emit(self, kind, **fields):
+        if self.file is None:
+            return
+        fields = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'type': kind, **fields}
+        with self.lock:
+            self.file.write(json.dumps(fields, ensure_ascii=False) + '\n')
+            self.file.flush()
+
+    def observe(self, stage, seconds, **labels):
+        with self.lock:
+            key = (stage, label_key(labels))
+            self.histograms.setdefault(key, Histogram()).observe(seconds)
+        self.emit('stage', stage=stage, seconds=round(seconds, 4), **labels)
+
+    @contextmanager
+    def time(self, stage, **labels):
+        """Time a block; the block may add labels (e.g. which strategy worked)"""
+        start = time.monotonic()
+        try:
+            yield labels
+        finally:
+            self.observe(stage, time.monotonic() - start, **labels)
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            key = (name, label_key(labels))
+            self.counters[key] = self.counters.get(key, 0) + value
+            if name == 'rows' and value:
+                now = time.monotonic()
+                self.row_times.append((now, value))
+                while self.row_times and self.row_times[0][0] < now - self.window:
+                    self.row_times.popleft()
+
+    def set(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def count(self, name, **labels):
+        return self.counters.get((name, label_key(labels)), 0)
+
+    def throughput(self):
+        """Rows per minute over the rolling window"""
+        with self.lock:
+            if not self.row_times:
+                return 0.0
+            span = min(self.window, time.monotonic() - self.started)
+            rows = sum(n for _, n in self.row_times)
+        return rows / (span / 60) if span > 0 else 0.0
+
+    def snapshot(self):
+        """Counters, per-stage p50/p95 and throughput as a plain dict"""
+        with self.lock:
+            counters = {name + format_labels(key): value
+                        for (name, key), value in self.counters.items()}
+            stages = {
+                stage + format_labels(key): {
+                    'count': h.count,
+                    'mean': round(h.sum / h.count, 4) if h.count else None,
+                    'p50': h.percentile(50),
+                    'p95': h.percentile(95),
+                }
+                for (stage, key), h in self.histograms.items()
+            }
+            gauges = dict(self.gauges)
+        return {
+            'elapsed_s': round(time.monotonic() - self.started, 1),
+            'rows_per_min': round(self.throughput(), 1),
+            'counters': counters,
+            'gauges': gauges,
+            'stages': stages,
+        }
+
+    def log_snapshot(self):
+        snapshot = self.snapshot()
+        self.emit('snapshot', **snapshot)
+        return snapshot
+
+    def prometheus_text(self):
+        lines = ['# TYPE ccr_stage_seconds histogram']
+        with self.lock:
+            for (stage, key), h in sorted(self.histograms.items()):
+                labels = (('stage', stage),) + key
+                for bound, count in zip(BUCKETS, h.buckets):
+                    lines.append(f"ccr_stage_seconds_bucket{format_labels(labels, [('le', bound)])} {count}")
+                lines.append(f"ccr_stage_seconds_bucket{format_labels(labels, [('le', '+Inf')])} {h.count}")
+                lines.append(f"ccr_stage_seconds_sum{format_labels(labels)} {h.sum:.6f}")
+                lines.append(f"ccr_stage_seconds_count{format_labels(labels)} {h.count}")
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE ccr_{name}_total counter")
+                for (counter, key), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"ccr_{name}_total{format_labels(key)} {value}")
+            for name, value in sorted(self.gauges.items()):
+                lines.append(f"# TYPE ccr_{name} gauge")
+                lines.append(f"ccr_{name} {value:.3f}")
+        lines.append('# TYPE ccr_rows_per_minute gauge')
+        lines.append(f"ccr_rows_per_minute {self.throughput():.3f}")
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve /metrics in Prometheus text format on a background thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200 if self.path.startswith('/metrics') else 404)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address[1]
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self.file:
+            self.log_snapshot()
+            self.file.close()
+            self.file = None
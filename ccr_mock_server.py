@@ -0,0 +1,470 @@
+"""
+Local stand-in for the CCR HomePage
+Serves a synthetic registry through the same ADF ids, pagination text and
+partial-page-render protocol the scrapers use, so runs can be tested offline.
+
+Usage:
+    python ccr_mock_server.py --port 8765 --records 1000
+    python ccr_mock_server.py --records 5000 --latency 0.3 --jitter 0.1
+    python ccr_mock_server.py --session-events 200     # sessions expire like the real site
+    python ccr_mock_server.py --max-range-size 25      # cap rangeChange fetch sizes at 25 rows
+    # then set "url": "http://127.0.0.1:8765/mitq/faces/HomePage" in config.json
+"""
+
+import argparse
+import html
+import random
+import re
+import secrets
+import threading
+import time
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from ccr_table import (DETAIL_ID, DETAIL_LINK_ID, NEXT_BUTTON_ID, SEARCH_BUTTON_ID,
+                       SEARCH_FIELDS, TABLE_ID)
+
+
+PATH = "/mitq/faces/HomePage"
+STATIC = "/mitq/adf/"
+RESULTS_ID = "pt1:pt_region0:1:results"
+PAGE_INPUT_ID = TABLE_ID + "::nb_in_pg"
+
+GOVERNORATES = ["عمان", "إربد", "الزرقاء", "العقبة", "البلقاء", "مادبا",
+                "الكرك", "المفرق", "جرش", "عجلون", "الطفيلة", "معان"]
+STATUSES = ["قائمة", "قائمة", "قائمة", "ملغاة", "موقوفة"]
+OWNERS = ["محمد أحمد", "خالد يوسف", "سارة محمود", "عمر عبدالله", "ليلى سمير", "يوسف علي"]
+STREETS = ["شارع المدينة المنورة", "شارع الجامعة", "شارع مكة", "حي معصوم", "وسط البلد"]
+NAMES = ["النور", "الأمل", "الريادة", "الياسمين", "البحر الأحمر", "الفجر", "السلام"]
+ACTIVITIES = ["للتجارة", "للمقاولات", "للخدمات", "للتجميل", "للاستيراد والتصدير"]
+NATIONALITIES = ["أردني", "أردني", "أردني", "سوري", "مصري", "عراقي"]
+GOALS = ["تجارة المواد الغذائية", "الاستيراد والتصدير", "تجارة الألبسة", "أعمال المقاولات",
+         "تقديم الخدمات الاستشارية", "تجارة الأجهزة الكهربائية", "صالون تجميل"]
+
+FIRST_REGISTRATION = date(1955, 1, 1)
+BASE_NUMBER = 100000  # registration numbers run BASE_NUMBER + 1 .. BASE_NUMBER + records
+
+STATIC_TYPES = {'png': 'image/png', 'woff2': 'font/woff2', 'js': 'application/javascript'}
+
+EVENT_PARAM = re.compile(r'<k v="(\w+)"><([sn])>(.*?)</\2></k>')
+DETAIL_LINK = re.compile(re.escape(DETAIL_LINK_ID).replace(r'\{row\}', r'(\d+)'))
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html dir="rtl" lang="ar">
+<head><meta charset="utf-8"><title>السجل التجاري</title>
+<style>
+@font-face {{ font-family: 'CCRArabic'; src: url('{static}fonts/arabic.woff2') format('woff2'); }}
+body {{ font-family: 'CCRArabic', sans-serif; }}
+.AFBlockingGlassPane {{ position: fixed; inset: 0; display: none; }}
+.p_AFDisabled {{ color: #999; }}
+</style>
+</head>
+<body>
+<div id="glass" class="AFBlockingGlassPane"></div>
+<img id="logo" src="{static}images/logo.png" alt="">
+<form id="f1" method="post" action="{path}?_adf.ctrl-state={ctrl_state}">
+<input type="hidden" name="org.apache.myfaces.trinidad.faces.FORM" value="f1">
+<input type="hidden" name="javax.faces.ViewState" value="{view_state}">
+{search_inputs}
+<a id="{search_id}" class="af_button" href="#" data-adf-event="action">بحث</a>
+<div id="{results_id}"></div>
+<div id="{detail_id}"></div>
+</form>
+<script>
+window.AdfPage = {{PAGE: {{pending: 0, isSynchronizedWithServer: function () {{ return this.pending === 0; }}}}}};
+function adfMessage(params) {{
+    var msg = '<m xmlns="http://oracle.com/richClient/comm">';
+    for (var k in params) {{
+        var tag = typeof params[k] === 'number' ? 'n' : 's';
+        msg += '<k v="' + k + '"><' + tag + '>' + params[k] + '</' + tag + '></k>';
+    }}
+    return msg + '</m>';
+}}
+function adfSend(source, params) {{
+    var form = document.getElementById('f1');
+    var data = new URLSearchParams(new FormData(form));
+    data.set('event', source);
+    data.set('event.' + source, adfMessage(params));
+    var glass = document.getElementById('glass');
+    AdfPage.PAGE.pending++;
+    glass.style.display = 'block';
+    return fetch(form.action, {{
+        method: 'POST', credentials: 'same-origin', body: data.toString(),
+        headers: {{'Adf-Rich-Message': 'true', 'Content-Type': 'application/x-www-form-urlencoded'}}
+    }}).then(function (r) {{ return r.text(); }}).then(function (text) {{
+        var doc = new DOMParser().parseFromString(text, 'application/xml');
+        var error = doc.getElementsByTagName('error-name')[0];
+        if (error) {{
+            var note = document.createElement('div');
+            note.className = 'af_message';
+            note.textContent = error.textContent;
+            document.body.appendChild(note);
+        }}
+        var updates = doc.getElementsByTagName('update');
+        for (var i = 0; i < updates.length; i++) {{
+            var el = document.getElementById(updates[i].getAttribute('id'));
+            if (el) {{ el.outerHTML = updates[i].textContent; }}
+        }}
+    }}).finally(function () {{
+        AdfPage.PAGE.pending--;
+        glass.style.display = 'none';
+    }});
+}}
+document.addEventListener('click', function (e) {{
+    var el = e.target.closest('[data-adf-event]');
+    if (!el) {{ return; }}
+    e.preventDefault();
+    if (el.className.indexOf('p_AFDisabled') !== -1) {{ return; }}
+    adfSend(el.id, {{type: el.getAttribute('data-adf-event')}});
+}});
+document.addEventListener('keydown', function (e) {{
+    if (e.key !== 'Enter' || e.target.id !== '{page_input_id}') {{ return; }}
+    e.preventDefault();
+    var size = parseInt(e.target.getAttribute('data-range-size'), 10);
+    adfSend('{table_id}', {{type: 'rangeChange', newStart: (parseInt(e.target.value, 10) - 1) * size}});
+}});
+</script>
+<script async src="{static}analytics.js"></script>
+</body>
+</html>
+"""
+
+
+def make_record(index, total, revision=0):
+    """Synthetic registry row; newest registrations come first like the live site
+
+    revision changes the status and capital of every tenth company, to stand
+    in for updates between two scrapes.
+    """
+    number = BASE_NUMBER + total - index
+    registered = FIRST_REGISTRATION + timedelta(days=(number - BASE_NUMBER) // 30)
+    changed = revision if number % 10 == 0 else 0
+    return [
+        str(number),
+        GOVERNORATES[number % len(GOVERNORATES)],
+        registered.strftime('%Y/%m/%d'),
+        OWNERS[number % len(OWNERS)],
+        STREETS[number % len(STREETS)],
+        f"مؤسسة {NAMES[number % len(NAMES)]} {ACTIVITIES[number % len(ACTIVITIES)]}",
+        str(1000 * (1 + (number + changed) % 50)),
+        STATUSES[(number + changed) % len(STATUSES)],
+    ]
+
+
+def make_detail(index, total):
+    """Synthetic detail popup for a row: partners, registered activities, capital history"""
+    number = BASE_NUMBER + total - index
+    capital = 1000 * (1 + number % 50)
+    partners = [[OWNERS[(number + i) % len(OWNERS)], NATIONALITIES[(number + i) % len(NATIONALITIES)],
+                 f"{100 // (1 + number % 3)}%"] for i in range(1 + number % 3)]
+    goals = [[GOALS[(number + i) % len(GOALS)]] for i in range(1 + number % 2)]
+    history = [[f"{1990 + (number // 1000 + i) % 35}/01/01", str(capital // (2 ** (2 - i)))]
+               for i in range(3)]
+    sections = [("الشركاء", ["الاسم", "الجنسية", "نسبة الحصة"], partners),
+                ("الغايات", ["الغاية"], goals),
+                ("تاريخ رأس المال", ["التاريخ", "رأس المال"], history)]
+    out = [f'<div id="{DETAIL_ID}" class="af_popup"><span class="af_popup-title">{number}</span>']
+    for title, columns, rows in sections:
+        out.append(f'<div class="af_panelHeader"><h2>{title}</h2><table>'
+                   + '<tr>' + ''.join(f'<th>{c}</th>' for c in columns) + '</tr>'
+                   + ''.join('<tr>' + ''.join(f'<td>{html.escape(v)}</td>' for v in row) + '</tr>'
+                             for row in rows)
+                   + '</table></div>')
+    out.append('</div>')
+    return ''.join(out)
+
+
+def matches_filters(record, filters):
+    """Search semantics of the mock: exact values, or a prefix when the value ends in '%'"""
+    for name, value in filters.items():
+        if not value:
+            continue
+        column = {'registration_number': 0, 'trade_name': 5}.get(name)
+        if column is None:
+            return False
+        cell = record[column]
+        if name == 'trade_name':
+            if value.strip('%') not in cell:
+                return False
+        elif value.endswith('%'):
+            if not cell.startswith(value[:-1]):
+                return False
+        elif cell != value:
+            return False
+    return True
+
+
+def parse_event_params(message):
+    """Decode an ADF event message (<m><k v="name"><s|n>value</s|n></k>...</m>)"""
+    params = {}
+    for name, kind, value in EVENT_PARAM.findall(message or ''):
+        params[name] = int(value) if kind == 'n' else html.unescape(value)
+    return params
+
+
+class MockRegistry:
+    """Synthetic dataset plus per-session ADF view state"""
+
+    def __init__(self, records=1000, rows_per_page=5, latency=0.0, jitter=0.0,
+                 session_events=0, revision=0, max_range_size=50):
+        self.total = records
+        self.rows_per_page = rows_per_page
+        self.max_range_size = max_range_size  # largest rangeSize a rangeChange may ask for
+        self.latency = latency
+        self.jitter = jitter
+        self.session_events = session_events  # events before a session expires (0 = never)
+        self.revision = revision
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def delay(self):
+        """Simulated server time for one request"""
+        seconds = self.latency + random.uniform(0, self.jitter) if self.jitter else self.latency
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def new_session(self):
+        session_id = secrets.token_hex(8)
+        with self.lock:
+            self.sessions[session_id] = {
+                'view_state': secrets.token_hex(6),
+                'ctrl_state': secrets.token_hex(4),
+                'searched': False,
+                'start': 0,
+                'range_size': self.rows_per_page,
+                'events': 0,
+                'matches': None,  # row indexes of a filtered search, None = everything
+            }
+        return session_id
+
+    def session(self, session_id):
+        with self.lock:
+            return self.sessions.get(session_id)
+
+    def expire(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def row_count(self, state):
+        return self.total if state['matches'] is None else len(state['matches'])
+
+    def handle_event(self, state, source, params, form=None):
+        """Apply an ADF event to the session state; returns extra (id, html) updates"""
+        count = self.row_count(state)
+        if source == SEARCH_BUTTON_ID:
+            filters = {name: (form or {}).get(field, '').strip()
+                       for name, field in SEARCH_FIELDS.items()}
+            state['matches'] = None if not any(filters.values()) else [
+                index for index in range(self.total)
+                if matches_filters(make_record(index, self.total, self.revision), filters)]
+            state['searched'] = True
+            state['start'] = 0
+            state['range_size'] = self.rows_per_page
+        elif source == NEXT_BUTTON_ID:
+            if state['start'] + state['range_size'] < count:
+                state['start'] += state['range_size']
+        elif source == TABLE_ID and params.get('type') == 'rangeChange':
+            # Like the ADF table, a rangeSize up to the server's limit changes the rows per page
+            if 'rangeSize' in params:
+                limit = max(self.max_range_size, self.rows_per_page)
+                state['range_size'] = max(1, min(int(params['rangeSize']), limit))
+            size = state['range_size']
+            start = int(params.get('newStart', 0))
+            last_start = max(0, (count - 1) // size * size)
+            state['start'] = max(0, min(start - start % size, last_start))
+        elif DETAIL_LINK.fullmatch(source) and state['searched']:
+            row = state['start'] + int(DETAIL_LINK.fullmatch(source).group(1))
+            if row < count:
+                index = row if state['matches'] is None else state['matches'][row]
+                return [(DETAIL_ID, make_detail(index, self.total))]
+        return []
+
+    def render_table(self, state):
+        start = state['start']
+        size = state['range_size']
+        count = self.row_count(state)
+        end = min(start + size, count)
+        page = start // size + 1
+        total_pages = max(1, -(-count // size))
+        indexes = range(count) if state['matches'] is None else state['matches']
+
+        headers = ["رقم التسجيل", "المحافظة", "تاريخ التسجيل", "مالك المؤسسة",
+                   "العنوان التجاري", "الإسم التجاري", "رأس المال الحالي", "الحالة", "الإجراء"]
+        out = [f'<div id="{TABLE_ID}" class="af_table"><table class="af_table_data-table"><tbody>',
+               '<tr class="af_table_filter-row">'
+               + '<td><input type="text"></td>' * len(headers) + '</tr>',
+               '<tr class="af_table_column-header-row">'
+               + ''.join(f'<td>{h}</td>' for h in headers) + '</tr>']
+        for row, index in enumerate(indexes[start:end]):
+            record = make_record(index, self.total, self.revision)
+            cells = ''.join(f'<td>{html.escape(c)}</td>' for c in record)
+            out.append(f'<tr class="af_table_data-row">{cells}'
+                       f'<td><a id="{TABLE_ID}:{row}:cl1" href="#">'
+                       f'<img src="{STATIC}images/view.png" alt="">عرض</a></td></tr>')
+        out.append('</tbody></table>')
+
+        disabled = ' p_AFDisabled' if end >= count else ''
+        out.append(
+            '<div class="af_table_navbar">'
+            f'<span>الصفحة {page} من (المجموع) {total_pages} (من {end}-{start + 1}) جزء</span>'
+            f'<input id="{PAGE_INPUT_ID}" type="text" value="{page}" data-range-size="{size}">'
+            f'<a id="{NEXT_BUTTON_ID}" class="af_table_navbar-next{disabled}" '
+            f'title="الصفحة التالية" href="#" data-adf-event="action">›</a>'
+            '</div></div>')
+        return ''.join(out)
+
+    def render_results(self, state):
+        body = self.render_table(state) if state['searched'] else ''
+        return f'<div id="{RESULTS_ID}">{body}</div>'
+
+
+def partial_response(updates):
+    changes = ''.join(f'<update id="{html.escape(target)}"><![CDATA[{content}]]></update>'
+                      for target, content in updates)
+    return f'<?xml version="1.0" ?><partial-response><changes>{changes}</changes></partial-response>'
+
+
+def view_expired_response():
+    return ('<?xml version="1.0" ?><partial-response><error>'
+            '<error-name>javax.faces.application.ViewExpiredException</error-name>'
+            '<error-message>View expired</error-message></error></partial-response>')
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    registry = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _session_id(self):
+        cookie = SimpleCookie(self.headers.get('Cookie', ''))
+        return cookie['JSESSIONID'].value if 'JSESSIONID' in cookie else None
+
+    def _send(self, body, content_type, session_id=None, status=200):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if session_id:
+            self.send_header('Set-Cookie', f'JSESSIONID={session_id}; Path=/')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if urlparse(self.path).path.startswith(STATIC):
+            # Images, fonts and analytics the real page pulls in on every render
+            self.registry.delay()
+            self._send('', STATIC_TYPES.get(self.path.rsplit('.', 1)[-1], 'text/plain'))
+            return
+        if urlparse(self.path).path != PATH:
+            self._send('not found', 'text/plain', status=404)
+            return
+        self.registry.delay()
+        session_id = self.registry.new_session()
+        state = self.registry.session(session_id)
+        page = PAGE_TEMPLATE.format(
+            path=PATH, ctrl_state=state['ctrl_state'], view_state=state['view_state'],
+            search_id=SEARCH_BUTTON_ID, results_id=RESULTS_ID, table_id=TABLE_ID,
+            page_input_id=PAGE_INPUT_ID, static=STATIC, detail_id=DETAIL_ID,
+            search_inputs=''.join(f'<input type="text" id="{field}" name="{field}" value="">'
+                                  for field in SEARCH_FIELDS.values()))
+        self._send(page, 'text/html', session_id)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+        state = self.registry.session(self._session_id())
+
+        if state is None or form.get('javax.faces.ViewState') != state['view_state']:
+            self._send(view_expired_response(), 'text/xml')
+            return
+        state['events'] += 1
+        if self.registry.session_events and state['events'] > self.registry.session_events:
+            self.registry.expire(self._session_id())
+            self._send(view_expired_response(), 'text/xml')
+            return
+
+        self.registry.delay()
+        source = form.get('event', '')
+        params = parse_event_params(form.get(f'event.{source}'))
+        with self.registry.lock:
+            # A detail popup only updates itself; everything else re-renders the results
+            updates = self.registry.handle_event(state, source, params, form) or \
+                [(RESULTS_ID, self.registry.render_results(state))]
+        self._send(partial_response(updates), 'text/xml')
+
+
+class MockCCRServer:
+    """Runs the mock registry on a background thread
+
+    with MockCCRServer(records=500) as server:
+        config['url'] = server.url
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, records=1000, rows_per_page=5,
+                 latency=0.0, jitter=0.0, session_events=0, revision=0, max_range_size=50):
+        handler = type('Handler', (MockHandler,), {
+            'registry': MockRegistry(records, rows_per_page, latency, jitter, session_events,
+                                     revision, max_range_size)})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.thread = None
+
+    @property
+    def registry(self):
+        return self.httpd.RequestHandlerClass.registry
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{PATH}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the CCR HomePage")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--records', type=int, default=1000)
+    parser.add_argument('--rows-per-page', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="seconds added to every request")
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help="extra random 0..jitter seconds per request")
+    parser.add_argument('--session-events', type=int, default=0,
+                        help="expire each session after this many ADF events (0 = never)")
+    parser.add_argument('--revision', type=int, default=0,
+                        help="change status/capital of every tenth company (for delta tests)")
+    parser.add_argument('--max-range-size', type=int, default=50,
+                        help="most rows one rangeChange event may fetch")
+    args = parser.parse_args()
+
+    server = MockCCRServer(args.host, args.port, args.records, args.rows_per_page,
+                           args.latency, args.jitter, args.session_events, args.revision,
+                           args.max_range_size)
+    print(f"Mock CCR server on {server.url} ({args.records:,} records)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
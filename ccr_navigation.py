@@ -0,0 +1,170 @@
+"""
+Pagination helpers for CCR
+Reads the "الصفحة N من (المجموع) M" indicator and moves the table to a given page
+"""
+
+import re
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from ccr_table import NEXT_BUTTON_ID, SEARCH_FIELDS, TABLE_ID
+
+
+PAGE_INPUT_ID = TABLE_ID + "::nb_in_pg"
+
+CURRENT_PAGE_PATTERN = re.compile(r'الصفحة\s*(\d+)')
+TOTAL_PAGES_PATTERN = re.compile(r'من\s*\(المجموع\)\s*(\d+)')
+
+# Text of the innermost element holding the pagination indicator
+PAGINATION_TEXT_SCRIPT = """
+var nodes = document.evaluate("//*[contains(text(), '(المجموع)')]", document, null,
+                              XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (var i = 0; i < nodes.snapshotLength; i++) {
+    var text = nodes.snapshotItem(i).textContent;
+    if (text.indexOf('الصفحة') !== -1) { return text; }
+}
+return null;
+"""
+
+GOTO_PAGE_SCRIPT = """
+var input = document.getElementById(arguments[0]);
+if (!input) { return false; }
+input.focus();
+input.value = String(arguments[1]);
+input.dispatchEvent(new Event('change', {bubbles: true}));
+input.dispatchEvent(new KeyboardEvent('keydown', {key: 'Enter', keyCode: 13, bubbles: true}));
+return true;
+"""
+
+# Posts a table rangeChange event (the fetch of the rows from arguments[1] on)
+# with the page's own form and ViewState, like AdfHttpClient.fire, and applies
+# the partial response the way the ADF client does: replace the updated
+# components, keep the new ViewState and run the <eval> scripts.
+RANGE_CHANGE_SCRIPT = """
+var table = document.getElementById(arguments[0]);
+var form = table && table.closest('form');
+if (!form || !window.fetch) { return false; }
+var data = new URLSearchParams(new FormData(form));
+data.set('event', arguments[0]);
+data.set('event.' + arguments[0], '<m xmlns="http://oracle.com/richClient/comm">'
+    + '<k v="type"><s>rangeChange</s></k><k v="newStart"><n>' + arguments[1] + '</n></k></m>');
+data.set('oracle.adf.view.rich.PROCESS', arguments[0]);
+fetch(form.action, {
+    method: 'POST', credentials: 'same-origin', body: data.toString(),
+    headers: {'Adf-Rich-Message': 'true', 'Content-Type': 'application/x-www-form-urlencoded'}
+}).then(function (r) { return r.text(); }).then(function (text) {
+    var doc = new DOMParser().parseFromString(text, 'application/xml');
+    var updates = doc.getElementsByTagName('update');
+    for (var i = 0; i < updates.length; i++) {
+        var id = updates[i].getAttribute('id');
+        if (id === 'javax.faces.ViewState') {
+            form.elements[id].value = updates[i].textContent;
+            continue;
+        }
+        var el = document.getElementById(id);
+        if (el) { el.outerHTML = updates[i].textContent; }
+    }
+    var scripts = doc.getElementsByTagName('eval');
+    for (var j = 0; j < scripts.length; j++) { (0, eval)(scripts[j].textContent); }
+});
+return true;
+"""
+
+NEXT_SCRIPT = """
+var nextBtn = document.getElementById(arguments[0]);
+if (nextBtn && !nextBtn.className.includes('p_AFDisabled')) {
+    nextBtn.click();
+    return true;
+}
+return false;
+"""
+
+
+def parse_pagination_text(text):
+    """Return (current page, total pages) from the indicator text; either may be None"""
+    if not text:
+        return None, None
+    current = CURRENT_PAGE_PATTERN.search(text)
+    total = TOTAL_PAGES_PATTERN.search(text)
+    return (int(current.group(1)) if current else None,
+            int(total.group(1)) if total else None)
+
+
+def read_pagination(driver):
+    """Return (current page, total pages) as displayed by the table"""
+    try:
+        return parse_pagination_text(driver.execute_script(PAGINATION_TEXT_SCRIPT))
+    except WebDriverException:
+        return None, None
+
+
+def goto_page(driver, ready, page, reload=False, rows_per_page=None):
+    """Move the results table to the given page
+
+    Types the page into the pagination bar's page field when there is one,
+    otherwise sends the table a rangeChange event for the page's first row
+    (what AdfHttpClient.goto_page does over HTTP). Only if both fail does it
+    click "next" until the indicator shows the page, which cannot go back.
+    With reload the table is made to fetch the current page again, by
+    stepping to a neighbouring page and back. rows_per_page is the size of
+    a full page when known (otherwise read from the table, unless it is on
+    its last page). Returns True once the indicator confirms the page.
+    """
+    current, total = read_pagination(driver)
+    if current == page and not reload:
+        return True
+    if total and page > total:
+        return False
+    if current == page:
+        neighbour = page - 1 if page > 1 else page + 1
+        if (total and neighbour > total) or not goto_page(driver, ready, neighbour,
+                                                          rows_per_page=rows_per_page):
+            return False
+        current, total = read_pagination(driver)
+
+    before = ready.fingerprint()
+    if driver.execute_script(GOTO_PAGE_SCRIPT, PAGE_INPUT_ID, page):
+        ready.wait('seek', previous=before)
+        current, _ = read_pagination(driver)
+        if current == page:
+            return True
+
+    before = ready.fingerprint()
+    if not rows_per_page and before and current and total and current < total:
+        rows_per_page = before[2]  # a full page (the last one may be short)
+    if before and rows_per_page:
+        if driver.execute_script(RANGE_CHANGE_SCRIPT, TABLE_ID, (page - 1) * rows_per_page):
+            ready.wait('seek', previous=before)
+            current, _ = read_pagination(driver)
+            if current == page:
+                return True
+
+    # Sequential fallback
+    if current is not None and current < page:
+        print(f"⚠️  Could not jump to page {page:,}; clicking next from page {current:,}")
+    while current is not None and current < page:
+        before = ready.fingerprint()
+        if not driver.execute_script(NEXT_SCRIPT, NEXT_BUTTON_ID):
+            return False
+        if not ready.wait('seek', previous=before):
+            return False
+        current, _ = read_pagination(driver)
+    return current == page
+
+
+def search_filters(search_params):
+    """Every search field with its config.json "search_params" value ('' when unset)"""
+    return {name: str((search_params or {}).get(name) or '') for name in SEARCH_FIELDS}
+
+
+def fill_search_form(driver, filters, timeout=15):
+    """Type the filters into the search form (empty values clear their field)"""
+    for name, value in filters.items():
+        field = WebDriverWait(driver, timeout).until(
+            EC.presence_of_element_located((By.ID, SEARCH_FIELDS[name])))
+        field.clear()
+        if value:
+            field.send_keys(value)
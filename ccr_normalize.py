@@ -0,0 +1,142 @@
+"""
+Typed normalization for CCR datasets
+Turns the scraped text columns into a typed, compact frame in one vectorized
+pass: Arabic-Indic digits become ASCII, registration numbers int64,
+registration dates datetime64, capital float64, the low-cardinality columns
+categoricals and the free-text columns Arabic-friendly pyarrow strings.
+Cells that do not parse are reported instead of silently kept as text.
+"""
+
+import pandas as pd
+
+from ccr_dedup import KEY_COLUMN
+from ccr_store import CATEGORICAL_COLUMNS
+
+
+DATE_COLUMN = "تاريخ التسجيل"
+CAPITAL_COLUMN = "رأس المال الحالي"
+
+# Arabic-Indic and Extended (Persian) digits, the Arabic decimal separator,
+# and thousands separators / direction marks to drop
+DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹٫', '01234567890123456789.',
+                       '\u066c,\u200e\u200f\u00a0 ')
+DIGITS_ONLY = str.maketrans('٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹', '01234567890123456789')
+NON_NUMERIC = r'[^0-9.]'
+# Registration date layouts, tried in turn (separators are unified to / first);
+# the registry shows year first, older entries and exports day first
+DATE_FORMATS = ('%Y/%m/%d', '%d/%m/%Y')
+
+# Search folding: drop diacritics (harakat, superscript alef, Quranic marks)
+# and tatweel, and unify alef, alef maqsura/ya and ta marbuta/ha forms
+ARABIC_FOLD = {**{code: None for code in range(0x064B, 0x0660)},
+               **{code: None for code in range(0x06D6, 0x06EE)},
+               0x0670: None, 0x0640: None,
+               **{ord(c): 'ا' for c in 'أإآٱ'}, ord('ى'): 'ي', ord('ة'): 'ه'}
+
+
+def ascii_digits(series):
+    """Text with Arabic-Indic digits as ASCII and separators removed"""
+    return series.astype(str).str.translate(DIGITS).str.strip()
+
+
+def canonical(value):
+    """One cell as comparable text: ASCII digits, and numbers without a trailing .0"""
+    text = str(value).translate(DIGITS).strip()
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return str(int(number)) if number.is_integer() else str(number)
+
+
+def fold_arabic(text):
+    """Text folded for search: no diacritics or tatweel, one alef/ya/ha form, ASCII digits"""
+    return ' '.join(str(text).translate(ARABIC_FOLD).translate(DIGITS_ONLY).lower().split())
+
+
+def normalize_frame(df):
+    """Typed copy of a scraped DataFrame; returns (frame, rejects)
+
+    Rows whose registration number is not a number are dropped. Dates are
+    read in any of DATE_FORMATS, with /, - or . separators and any time of
+    day ignored. Dates and capital that do not parse become NaT/NaN. Every
+    such cell is listed in rejects (columns: row = position in df, column,
+    value, dropped).
+    """
+    frame = pd.DataFrame(index=df.index)
+    rejects = []
+
+    def reject(mask, column, dropped=False):
+        if mask.any():
+            rejects.append(pd.DataFrame({'row': df.index[mask], 'column': column,
+                                         'value': df.loc[mask, column].astype(str),
+                                         'dropped': dropped}))
+
+    for column in df.columns:
+        if column in CATEGORICAL_COLUMNS:
+            frame[column] = df[column].astype('category')
+            continue
+        raw = df[column].fillna('')
+        if column == KEY_COLUMN:
+            text = ascii_digits(raw)
+            valid = text.str.fullmatch(r'[0-9]+')
+            reject(~valid, column, dropped=True)
+            frame[column] = pd.to_numeric(text.where(valid), errors='coerce')
+        elif column == DATE_COLUMN:
+            day = raw.astype(str).str.strip().str.split(r'[\sT]', n=1, regex=True).str[0]
+            text = ascii_digits(day).str.replace(r'[-.]', '/', regex=True)
+            parsed = pd.to_datetime(text, format=DATE_FORMATS[0], errors='coerce')
+            for date_format in DATE_FORMATS[1:]:
+                retry = parsed.isna() & (text != '')
+                if retry.any():
+                    parsed[retry] = pd.to_datetime(text[retry], format=date_format, errors='coerce')
+            reject(parsed.isna() & (text != ''), column)
+            frame[column] = parsed
+        elif column == CAPITAL_COLUMN:
+            text = ascii_digits(raw).str.replace(NON_NUMERIC, '', regex=True)
+            parsed = pd.to_numeric(text, errors='coerce')
+            reject(parsed.isna() & (raw.astype(str).str.strip() != ''), column)
+            frame[column] = parsed.astype('float64')
+        else:
+            frame[column] = raw.astype('string[pyarrow]')
+
+    if KEY_COLUMN in frame:
+        frame = frame[frame[KEY_COLUMN].notna()].astype({KEY_COLUMN: 'int64'})
+    rejects = pd.concat(rejects, ignore_index=True) if rejects else \
+        pd.DataFrame(columns=['row', 'column', 'value', 'dropped'])
+    return frame.reset_index(drop=True), rejects
+
+
+class NormalizedRecords:
+    """A normalized frame behind the RecordStore interface the output writers use"""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.columns = list(frame.columns)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __iter__(self):
+        # Plain Python values: dates as datetime.date, missing cells as ''
+        columns = []
+        for column in self.columns:
+            series = self.frame[column]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                values = series.dt.date.astype(object).where(series.notna(), '').tolist()
+            else:
+                values = series.astype(object).where(series.notna(), '').tolist()
+            columns.append(values)
+        for row in zip(*columns):
+            yield dict(zip(self.columns, row))
+
+    def to_arrow(self):
+        import pyarrow as pa
+
+        return pa.Table.from_pandas(self.frame, preserve_index=False)
+
+
+def normalize_store(store):
+    """(NormalizedRecords, rejects) for a RecordStore"""
+    frame, rejects = normalize_frame(store.to_dataframe())
+    return NormalizedRecords(frame), rejects
@@ -0,0 +1,94 @@
+"""
+Output writers for CCR datasets
+Writes a RecordStore as Parquet (optionally partitioned by governorate),
+CSV or a streamed write-only xlsx.
+"""
+
+import csv
+import os
+
+from openpyxl import Workbook
+
+
+EXTENSIONS = {'excel': '.xlsx', 'csv': '.csv', 'parquet': '.parquet'}
+
+
+def write_xlsx(store, path):
+    """Stream rows into a write-only workbook (constant memory, no DataFrame)"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(store.columns)
+    for record in store:
+        sheet.append([record[c] for c in store.columns])
+    workbook.save(path)
+    return path
+
+
+def write_csv(store, path):
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(store.columns)
+        for record in store:
+            writer.writerow([record[c] for c in store.columns])
+    return path
+
+
+def write_parquet(store, path, partition_by=None):
+    """Write a Parquet file, or a hive-partitioned directory when partition_by is set"""
+    import pyarrow.parquet as pq
+
+    table = store.to_arrow()
+    if partition_by:
+        pq.write_to_dataset(table, root_path=path, partition_cols=[partition_by], compression='zstd')
+    else:
+        pq.write_table(table, path, compression='zstd')
+    return path
+
+
+def write_output(store, output_config, stem):
+    """Write the dataset in the configured format; returns the paths written
+
+    output_config is config.json's "output" section:
+        format          "excel" | "csv" | "parquet"
+        partition_by    column to partition Parquet output by (e.g. "المحافظة")
+        xlsx_export     also stream an xlsx copy next to a csv/parquet output
+        normalize       write typed columns (ccr_normalize); cells that do not
+                        parse are listed in <stem>_rejects.csv
+        search_index    also build <stem>_search.sqlite for ccr_search.py
+    """
+    output_format = output_config.get('format', 'excel')
+    path = stem + EXTENSIONS.get(output_format, '.xlsx')
+
+    rejects_path = None
+    if output_config.get('normalize'):
+        from ccr_normalize import normalize_store
+
+        store, rejects = normalize_store(store)
+        if len(rejects):
+            rejects_path = stem + '_rejects.csv'
+            rejects.to_csv(rejects_path, index=False, encoding='utf-8-sig')
+
+    if output_format == 'parquet':
+        paths = [write_parquet(store, path, output_config.get('partition_by'))]
+    elif output_format == 'csv':
+        paths = [write_csv(store, path)]
+    else:
+        paths = [write_xlsx(store, path)]
+
+    if output_config.get('xlsx_export') and output_format in ('parquet', 'csv'):
+        paths.append(write_xlsx(store, stem + '.xlsx'))
+    if rejects_path:
+        paths.append(rejects_path)
+    if output_config.get('search_index'):
+        from ccr_search import build_search_index, index_path
+
+        paths.append(build_search_index(store, index_path(path)))
+    return paths
+
+
+def output_size_mb(path):
+    """Size on disk of a file or partitioned directory"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names) / (1024 * 1024)
+    return os.path.getsize(path) / (1024 * 1024)
@@ -0,0 +1,123 @@
+"""
+Adaptive request pacing for CCR
+A token bucket whose rate follows AIMD: every clean, fast page adds a little
+to the rate, and a timeout, empty page or error cuts it by a factor. The
+bucket lives in shared memory, so worker processes started with
+share(state) as their pool initializer all draw from the same budget.
+"""
+
+import multiprocessing
+import time
+
+
+# Indexes into the shared array
+RATE, TOKENS, REFILLED_AT, DECREASED_AT = range(4)
+
+_shared = None  # the parent's PacerState, inside worker processes
+
+
+class PacerState:
+    """Rate and bucket fill level in shared memory, guarded by a process lock"""
+
+    def __init__(self, rate, burst=1.0):
+        self.lock = multiprocessing.Lock()
+        self.values = multiprocessing.RawArray('d', [rate, burst, time.monotonic(), 0.0])
+
+
+def share(state):
+    """Pool initializer: make worker processes use the parent's bucket"""
+    global _shared
+    _shared = state
+
+
+def shared_state(config):
+    """A PacerState for config.json's "pacer" section, to hand to worker processes"""
+    config = config or {}
+    return PacerState(config.get('initial_rate', 1.0), config.get('burst', 1.0))
+
+
+class Pacer:
+    """Spaces out requests to the registry and adapts the pace to how it responds
+
+    config is config.json's "pacer" section:
+        initial_rate     requests per second to start with
+        min_rate         never go slower than this
+        max_rate         never go faster than this
+        increase         requests/s added after each clean page
+        decrease         factor applied on a timeout, empty page or error
+        target_latency   pages slower than this (seconds) count as a slowdown
+        burst            requests that may go out back to back
+        cooldown         seconds between two decreases, so one incident seen
+                         by several workers only backs off once
+    """
+
+    def __init__(self, config=None, state=None, metrics=None):
+        config = config or {}
+        self.enabled = config.get('enabled', False)
+        self.min_rate = config.get('min_rate', 0.1)
+        self.max_rate = config.get('max_rate', 10.0)
+        self.increase = config.get('increase', 0.1)
+        self.decrease = config.get('decrease', 0.5)
+        self.target_latency = config.get('target_latency', 2.0)
+        self.burst = config.get('burst', 1.0)
+        self.cooldown = config.get('cooldown', 5.0)
+        self.state = state or _shared or shared_state(config)
+        self.metrics = metrics
+
+    @property
+    def rate(self):
+        return self.state.values[RATE]
+
+    def acquire(self):
+        """Block until the bucket allows one more request"""
+        if not self.enabled:
+            return 0.0
+        values = self.state.values
+        waited = 0.0
+        while True:
+            with self.state.lock:
+                now = time.monotonic()
+                values[TOKENS] = min(self.burst,
+                                     values[TOKENS] + (now - values[REFILLED_AT]) * values[RATE])
+                values[REFILLED_AT] = now
+                if values[TOKENS] >= 1:
+                    values[TOKENS] -= 1
+                    break
+                delay = (1 - values[TOKENS]) / values[RATE]
+            time.sleep(delay)
+            waited += delay
+        if self.metrics and waited:
+            self.metrics.observe('pace_wait', waited)
+        return waited
+
+    def success(self, seconds):
+        """A page came back with rows; slow pages count as a slowdown"""
+        if not self.enabled:
+            return
+        if self.target_latency and seconds > self.target_latency:
+            self.failure('slow')
+            return
+        with self.state.lock:
+            values = self.state.values
+            values[RATE] = min(self.max_rate, values[RATE] + self.increase)
+            rate = values[RATE]
+        if self.metrics:
+            self.metrics.set('pace_rate', rate)
+
+    def failure(self, reason):
+        """Back off multiplicatively (at most once per cooldown across all workers)"""
+        if not self.enabled:
+            return
+        with self.state.lock:
+            values = self.state.values
+            now = time.monotonic()
+            if now - values[DECREASED_AT] < self.cooldown:
+                return
+            values[DECREASED_AT] = now
+            values[RATE] = max(self.min_rate, values[RATE] * self.decrease)
+            rate = values[RATE]
+        print(f"🐢 Pacer: {reason}, backing off to {rate:.2f} req/s")
+        if self.metrics:
+            self.metrics.set('pace_rate', rate)
+            self.metrics.inc('pace_backoffs', reason=reason)
+            self.metrics.emit('pace', rate=round(rate, 3), reason=reason)
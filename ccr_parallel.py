@@ -0,0 +1,154 @@
+"""
+Parallel Bulk Scraper
+Runs several browser sessions side by side, each on its own contiguous page range
+
+Usage:
+    python ccr_parallel.py                      # workers from config.json "parallel"
+    python ccr_parallel.py --workers 4
+    python ccr_parallel.py --workers 3 --mock 500   # against a local mock server
+"""
+
+import argparse
+import copy
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from ccr_dedup import DedupIndex
+from ccr_pacer import share, shared_state
+from scraper_bulk import CCRBulkScraper
+
+
+def plan_shards(total_pages, workers):
+    """Split pages 1..total_pages into at most `workers` contiguous (start, end) ranges"""
+    workers = max(1, min(workers, total_pages))
+    size, extra = divmod(total_pages, workers)
+    shards = []
+    start = 1
+    for i in range(workers):
+        end = start + size - 1 + (1 if i < extra else 0)
+        shards.append((start, end))
+        start = end + 1
+    return shards
+
+
+def scrape_shard(config, worker_id, start_page, end_page):
+    """Worker process: scrape one page range in its own browser
+
+    Returns (worker_id, records, error). Records collected before an error are kept.
+    """
+    scraper = CCRBulkScraper(config)
+    scraper.checkpoint_prefix = f"ccr_checkpoint_w{worker_id}"
+    scraper.log_prefix = f"[W{worker_id}] "
+    port = config.get('metrics', {}).get('prometheus_port')
+    try:
+        scraper.start_metrics(port + worker_id if port else None)
+        scraper.setup_backend()
+        scraper.navigate_and_search()
+        if not scraper.goto_page(start_page):
+            raise RuntimeError(f"could not reach page {start_page}")
+        scraper.scrape(start_page, end_page)
+        # Rows after the last interval checkpoint, and the shard's range for ccr_verify
+        scraper.save_checkpoint('complete')
+        return worker_id, scraper.data, None
+    except Exception as e:
+        scraper.save_checkpoint('error')
+        return worker_id, scraper.data, str(e)
+    finally:
+        scraper.close()
+        scraper.metrics.close()
+
+
+def merge_shards(shard_records):
+    """Concatenate shard results in page order, keeping the first row per registration number"""
+    index = DedupIndex()
+    merged = []
+    for records in shard_records:
+        merged.extend(index.filter(records)[0])
+    return merged
+
+
+class ParallelBulkScraper:
+    """Shards the result pages across N browser sessions"""
+
+    def __init__(self, config):
+        self.config = config
+        self.workers = config.get('parallel', {}).get('workers', 1)
+        self.start_time = datetime.now()
+
+    def discover_total_pages(self):
+        """Run the search once to read the total page count"""
+        probe = CCRBulkScraper(self.config)
+        try:
+            probe.setup_backend()
+            probe.navigate_and_search()
+            return probe.get_pagination_info()
+        finally:
+            probe.close()
+
+    def run(self):
+        print("\n" + "="*70)
+        print(f"  PARALLEL BULK SCRAPER - {self.workers} workers")
+        print("="*70 + "\n")
+
+        max_pages = self.config['pagination']['max_pages']
+        total_pages = self.discover_total_pages()
+        if total_pages:
+            print(f"📊 Total pages detected: {total_pages:,}")
+            total_pages = min(total_pages, max_pages)
+        else:
+            print("⚠️  Could not read total pages, using max_pages")
+            total_pages = max_pages
+
+        shards = plan_shards(total_pages, self.workers)
+        for worker_id, (start, end) in enumerate(shards, 1):
+            print(f"   W{worker_id}: pages {start:,}-{end:,}")
+        print()
+
+        results = {}
+        # Every worker draws from one request budget
+        with ProcessPoolExecutor(max_workers=len(shards), initializer=share,
+                                 initargs=(shared_state(self.config.get('pacer')),)) as pool:
+            futures = [pool.submit(scrape_shard, self.config, worker_id, start, end)
+                       for worker_id, (start, end) in enumerate(shards, 1)]
+            for future in as_completed(futures):
+                worker_id, records, error = future.result()
+                results[worker_id] = records
+                if error:
+                    print(f"\n✗ W{worker_id} stopped early: {error} ({len(records):,} records kept)")
+                else:
+                    print(f"\n✓ W{worker_id} finished: {len(records):,} records")
+
+        merged = merge_shards(results[w] for w in sorted(results))
+        if not merged:
+            print("\n⚠ No data was extracted")
+            return None
+
+        writer = CCRBulkScraper(self.config)
+        writer.data.extend(merged)
+        writer.start_time = self.start_time
+        return writer.save_final(total_pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel bulk scraper")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--workers', type=int, help="override parallel.workers")
+    parser.add_argument('--mock', type=int, metavar='RECORDS',
+                        help="scrape a local mock server with this many records")
+    args = parser.parse_args()
+
+    config = copy.deepcopy(CCRBulkScraper(args.config).config)
+    if args.workers:
+        config.setdefault('parallel', {})['workers'] = args.workers
+
+    if args.mock:
+        from ccr_mock_server import MockCCRServer
+        with MockCCRServer(records=args.mock) as server:
+            config['url'] = server.url
+            ParallelBulkScraper(config).run()
+    else:
+        ParallelBulkScraper(config).run()
+
+
+if __name__ == "__main__":
+    main()
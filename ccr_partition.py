@@ -0,0 +1,253 @@
+"""
+Partitioned scraping for CCR
+Splits the registry into registration-number prefix searches (e.g. "12%"),
+each small enough to page through quickly, then scrapes the slices in
+parallel. The plan is saved next to the checkpoints, so an interrupted run
+picks up the slices that have not finished yet.
+
+Usage:
+    python ccr_partition.py --plan-only              # probe and print the slices
+    python ccr_partition.py --workers 4              # plan (or load the saved plan) and scrape
+    python ccr_partition.py --workers 3 --mock 2000  # against a local mock server
+"""
+
+import argparse
+import copy
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from ccr_checkpoint import CheckpointSink
+from ccr_dedup import DedupIndex
+from ccr_pacer import share, shared_state
+from scraper_bulk import CCRBulkScraper
+
+
+PLAN_NAME = "ccr_partitions.json"
+DIGITS = "0123456789"
+MAX_PREFIX_LENGTH = 12
+
+
+def count_pages(probe, filters):
+    """Re-run the probe's search with filters; returns the number of result pages"""
+    probe.config['search_params'] = filters
+    probe.search()
+    if probe.ready.fingerprint() is None:
+        return 0
+    return probe.get_pagination_info() or 1
+
+
+def plan_partitions(probe, max_slice_pages, prefixes="123456789"):
+    """Split the registry into prefix searches of at most max_slice_pages pages
+
+    A prefix with too many pages is replaced by its ten one-digit-longer
+    prefixes, plus the number equal to the prefix itself, which none of
+    the longer prefixes match.
+    """
+    queue = deque(prefixes)
+    slices = []
+    while queue:
+        prefix = queue.popleft()
+        pages = count_pages(probe, {'registration_number': prefix + '%'})
+        if not pages:
+            continue
+        if pages <= max_slice_pages or len(prefix) >= MAX_PREFIX_LENGTH:
+            slices.append({'name': f"p{prefix}", 'search_params': {'registration_number': prefix + '%'},
+                           'pages': pages, 'status': 'pending'})
+            print(f"   {prefix}%: {pages:,} pages")
+            continue
+
+        exact = count_pages(probe, {'registration_number': prefix})
+        if exact:
+            slices.append({'name': f"n{prefix}", 'search_params': {'registration_number': prefix},
+                           'pages': exact, 'status': 'pending'})
+        queue.extend(prefix + digit for digit in DIGITS)
+    return slices
+
+
+class PartitionPlan:
+    """The slices of a partitioned run and how far each has got"""
+
+    def __init__(self, path, slices=None, created_at=None):
+        self.path = path
+        self.slices = slices or []
+        self.created_at = created_at or datetime.now().isoformat(timespec='seconds')
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(path, data['slices'], data.get('created_at'))
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'created_at': self.created_at, 'slices': self.slices},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def pending(self):
+        return [s for s in self.slices if s['status'] != 'done']
+
+    @property
+    def total_pages(self):
+        return sum(s['pages'] for s in self.slices)
+
+
+def scrape_slice(config, item):
+    """Worker process: scrape one slice into its own checkpoint run
+
+    Returns (name, run_dir, records, pages, status, error). The slice's page
+    count is read again from its search, so rows registered since planning
+    are not cut off; it is 'done' only once its last page is stored. An
+    unfinished slice resumes from its last checkpoint the next time it runs.
+    """
+    config = copy.deepcopy(config)
+    config['search_params'] = {**config.get('search_params', {}), **item['search_params']}
+    config.setdefault('checkpoint', {})['resume'] = True
+    scraper = CCRBulkScraper(config)
+    scraper.checkpoint_prefix = f"ccr_slice_{item['name']}"
+    scraper.log_prefix = f"[{item['name']}] "
+    pages, status, error = item['pages'], 'error', None
+    try:
+        scraper.start_metrics()
+        scraper.setup_backend()
+        scraper.navigate_and_search()
+        pages = scraper.total_pages or pages
+        if pages != item['pages']:
+            print(f"{scraper.log_prefix}ℹ️  Slice now has {pages:,} pages (planned {item['pages']:,})")
+        start_page = scraper.resume()
+        scraper.open_dedup_index()
+        if start_page is not None:
+            scraper.scrape(start_page, pages)
+        status = 'done' if start_page is None or scraper.reached_end() else 'stopped'
+        scraper.save_checkpoint('complete' if status == 'done' else 'stopped')
+    except Exception as e:
+        scraper.save_checkpoint('error')
+        error = str(e)
+    finally:
+        scraper.close()
+        scraper.metrics.close()
+    run_dir = scraper.sink.run_dir if scraper.sink else None
+    return item['name'], run_dir, len(scraper.data), pages, status, error
+
+
+class PartitionedScraper:
+    """Plans prefix slices and scrapes them across worker processes"""
+
+    def __init__(self, config):
+        self.config = config
+        partition = config.get('partition', {})
+        self.max_slice_pages = partition.get('max_slice_pages', 2000)
+        self.prefixes = partition.get('prefixes') or list("123456789")
+        self.workers = config.get('parallel', {}).get('workers', 1)
+        checkpoint_dir = config.get('checkpoint', {}).get('dir', 'checkpoints')
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.plan_path = os.path.join(checkpoint_dir, PLAN_NAME)
+        self.start_time = datetime.now()
+
+    def load_or_plan(self):
+        """The saved plan if one is unfinished, otherwise probe a new one"""
+        if os.path.exists(self.plan_path):
+            plan = PartitionPlan.load(self.plan_path)
+            if plan.pending():
+                print(f"↩️  Resuming plan {self.plan_path}: "
+                      f"{len(plan.pending())} of {len(plan.slices)} slices left")
+                return plan
+
+        print(f"🧭 Planning slices of at most {self.max_slice_pages:,} pages...")
+        probe = CCRBulkScraper(copy.deepcopy(self.config))
+        try:
+            probe.setup_backend()
+            probe.navigate_and_search()
+            slices = plan_partitions(probe, self.max_slice_pages, self.prefixes)
+        finally:
+            probe.close()
+
+        plan = PartitionPlan(self.plan_path, slices)
+        plan.save()
+        print(f"✓ {len(slices)} slices, {plan.total_pages:,} pages in total")
+        return plan
+
+    def run(self):
+        print("\n" + "="*70)
+        print(f"  PARTITIONED SCRAPER - {self.workers} workers")
+        print("="*70 + "\n")
+
+        plan = self.load_or_plan()
+        pending = plan.pending()
+        by_name = {s['name']: s for s in plan.slices}
+        with ProcessPoolExecutor(max_workers=max(1, self.workers), initializer=share,
+                                 initargs=(shared_state(self.config.get('pacer')),)) as pool:
+            futures = [pool.submit(scrape_slice, self.config, item) for item in pending]
+            for future in as_completed(futures):
+                name, run_dir, records, pages, status, error = future.result()
+                item = by_name[name]
+                item['run_dir'] = run_dir
+                item['records'] = records
+                item['pages'] = pages
+                item['status'] = status
+                plan.save()
+                if error:
+                    print(f"\n✗ {name} stopped early: {error} ({records:,} records checkpointed)")
+                elif status != 'done':
+                    print(f"\n⚠️  {name} stopped before its last page ({records:,} records checkpointed)")
+                else:
+                    print(f"\n✓ {name} finished: {records:,} records")
+
+        return self.merge(plan)
+
+    def merge(self, plan):
+        """Combine every slice's checkpoint run into the final output"""
+        index = DedupIndex()
+        writer = CCRBulkScraper(self.config)
+        for item in plan.slices:
+            if item.get('run_dir'):
+                records = list(CheckpointSink(item['run_dir']).records())
+                writer.data.extend(index.filter(records)[0])
+        if not writer.data:
+            print("\n⚠ No data was extracted")
+            return None
+        if plan.pending():
+            print(f"\n⚠️  {len(plan.pending())} slices did not finish; run again to resume them")
+        writer.duplicate_count = sum(s.get('records', 0) for s in plan.slices) - len(writer.data)
+        writer.start_time = self.start_time
+        return writer.save_final(plan.total_pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partitioned (prefix-sliced) scraper")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--workers', type=int, help="override parallel.workers")
+    parser.add_argument('--max-slice-pages', type=int, help="override partition.max_slice_pages")
+    parser.add_argument('--plan-only', action='store_true', help="probe and save the plan, then stop")
+    parser.add_argument('--mock', type=int, metavar='RECORDS',
+                        help="scrape a local mock server with this many records")
+    args = parser.parse_args()
+
+    config = copy.deepcopy(CCRBulkScraper(args.config).config)
+    if args.workers:
+        config.setdefault('parallel', {})['workers'] = args.workers
+    if args.max_slice_pages:
+        config.setdefault('partition', {})['max_slice_pages'] = args.max_slice_pages
+
+    def run():
+        scraper = PartitionedScraper(config)
+        if args.plan_only:
+            scraper.load_or_plan()
+        else:
+            scraper.run()
+
+    if args.mock:
+        from ccr_mock_server import MockCCRServer
+        with MockCCRServer(records=args.mock) as server:
+            config['url'] = server.url
+            run()
+    else:
+        run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Pipelined scraping for CCRBulkScraper
+The calling thread only navigates and grabs each page's raw table HTML.
+A parse thread turns it into records and deduplicates them, and a writer
+thread appends checkpoint segments, so neither parsing nor a slow disk
+holds up pagination. The stages are joined by bounded queues: if a
+downstream stage falls far enough behind, the one before it waits. Pages
+the parse stage finds empty go back to the fetch stage to be fetched again,
+and the resume point stays below them until they are stored.
+"""
+
+import queue
+import threading
+import time
+
+from requests import RequestException
+from selenium.common.exceptions import WebDriverException
+
+from ccr_http import AdfError
+from ccr_table import fetch_table_html, parse_table_html, rows_to_records
+
+
+DONE = None  # end-of-stream marker passed down the queues
+MAX_RETRIES = 3  # fetches of an empty page before each retry starts a fresh session
+
+
+class ScrapePipeline:
+    """fetch (calling thread) -> parse (thread) -> write (thread)"""
+
+    def __init__(self, scraper, queue_pages=32, queue_checkpoints=4):
+        self.scraper = scraper
+        self.pages = queue.Queue(maxsize=queue_pages)
+        self.batches = queue.Queue(maxsize=queue_checkpoints)
+        self.retries = queue.Queue()  # (page, attempt) the parse stage found no rows on
+        self.attempts = {}  # page -> retries so far, until the page is stored
+        self.keys = {}  # page -> [first, last] keys of stored pages from the resume point up
+        self.top = 0  # highest page stored
+        self.in_flight = 0  # pages queued for, or being parsed by, the parse stage
+        self.idle = threading.Condition()
+        self.stop = threading.Event()
+        self.error = None
+        self.fetched_page = None  # last page handed to the parse stage
+
+    def put(self, q, item):
+        """Blocking put that gives up once a stage has failed or asked to stop"""
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                self.scraper.metrics.inc('backpressure_waits')
+        return False
+
+    def queue_page(self, page, html):
+        """Hand a page to the parse stage, counting it until it has been parsed"""
+        with self.idle:
+            self.in_flight += 1
+        if self.put(self.pages, (page, html)):
+            return True
+        self.page_done()
+        return False
+
+    def page_done(self):
+        with self.idle:
+            self.in_flight -= 1
+            self.idle.notify_all()
+
+    def fail(self, error):
+        self.error = self.error or error
+        self.stop.set()
+
+    def run(self, start_page, end_page):
+        scraper = self.scraper
+        scraper.page = start_page
+        scraper.start_page = scraper.start_page or start_page
+        scraper.end_page = end_page
+        self.keys = {scraper.completed_page: scraper.last_keys}
+        self.top = scraper.completed_page
+        parser = threading.Thread(target=self.parse_stage, name='ccr-parse', daemon=True)
+        writer = threading.Thread(target=self.write_stage, name='ccr-write', daemon=True)
+        parser.start()
+        writer.start()
+        try:
+            self.fetch_stage(start_page, end_page)
+        finally:
+            # Let the downstream stages drain what was already fetched
+            while parser.is_alive():
+                try:
+                    self.pages.put(DONE, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            parser.join()
+            writer.join()
+        if self.error is not None:
+            raise self.error
+
+    def fetch_stage(self, start_page, end_page):
+        """Navigate page by page and queue each page's raw table HTML"""
+        scraper = self.scraper
+        failures = 0
+        while scraper.page <= end_page and not (self.stop.is_set() or scraper.stop_requested):
+            page_start = time.monotonic()
+            try:
+                scraper.wait_ready('extract')
+                with scraper.metrics.time('fetch'):
+                    html = scraper.http.table_html if scraper.http else fetch_table_html(scraper.driver)
+
+                if not html:
+                    failures += 1
+                    scraper.metrics.inc('failures')
+                    scraper.pacer.failure('empty')
+                    print(f"{scraper.log_prefix}[Page {scraper.page:,}/{end_page:,}] ✗ No table "
+                          f"(failure {failures}/3)")
+                    if failures >= 3:
+                        if not scraper.recover(scraper.page, 'no_data'):
+                            break
+                        failures = 0
+                    else:
+                        scraper.metrics.inc('retries')
+                    continue
+                failures = 0
+
+                if not self.queue_page(scraper.page, html):
+                    break
+                self.fetched_page = scraper.page
+
+                if scraper.page >= end_page or not scraper.advance(page_start):
+                    break
+                if not self.retries.empty() and not self.refetch_empty(restore=True):
+                    break
+
+            except (WebDriverException, RequestException, AdfError) as e:
+                if not scraper.recover_from(e, page_done=self.fetched_page == scraper.page):
+                    break
+        self.settle()
+
+    def refetch_empty(self, restore):
+        """Fetch the pages the parse stage found empty again, then (with restore)
+        go back to the page the fetch stage is on. False if a page cannot be reached."""
+        scraper = self.scraper
+        current = scraper.page
+        while not self.retries.empty():
+            page, attempt = self.retries.get()
+            print(f"{scraper.log_prefix}[Page {page:,}] ↻ No rows, fetching again "
+                  f"(retry {attempt})")
+            scraper.metrics.inc('retries')
+            try:
+                # Like the sequential loop: reload in place, and from the last
+                # try on (or when a reload fails) start a fresh session on it
+                reached = attempt < MAX_RETRIES and scraper.goto_page(page, reload=True)
+                if not reached:
+                    reached = scraper.recover(page, 'no_data')
+                if not reached:
+                    print(f"{scraper.log_prefix}✗ Page {page:,} still has no rows and the session "
+                          f"cannot be restarted - stopping; a resume starts from it")
+                    self.stop.set()
+                    return False
+                scraper.wait_ready('extract')
+                html = scraper.http.table_html if scraper.http else fetch_table_html(scraper.driver)
+            except (WebDriverException, RequestException, AdfError):
+                self.retries.put((page, attempt))
+                raise
+            if not self.queue_page(page, html):
+                return False
+        if restore and not (scraper.goto_page(current) or scraper.recover(current, 'no_data')):
+            print(f"{scraper.log_prefix}✗ Could not return to page {current:,} after a retry - stopping")
+            self.stop.set()
+            return False
+        return True
+
+    def settle(self):
+        """Before the end of the stream: wait for the parse stage to catch up and
+        serve the retries it still asks for"""
+        while not self.stop.is_set():
+            if not self.retries.empty():
+                try:
+                    if not self.refetch_empty(restore=False):
+                        return
+                except (WebDriverException, RequestException, AdfError) as e:
+                    if not self.scraper.recover_from(e, page_done=True):
+                        return
+                continue
+            with self.idle:
+                # The parse stage queues a retry before it counts its page done
+                if not self.in_flight and self.retries.empty():
+                    return
+                self.idle.wait(0.05)
+
+    def store(self, page, records):
+        """store_page, keeping the resume point (completed_page / last_keys)
+        below the lowest page still waiting to be fetched again"""
+        scraper = self.scraper
+        new = scraper.store_page(page, records)
+        self.attempts.pop(page, None)
+        self.keys[page] = scraper.page_keys(records)
+        self.top = max(self.top, page)
+        frontier = min(self.attempts) - 1 if self.attempts else self.top
+        frontier = max(stored for stored in self.keys if stored <= frontier)
+        scraper.completed_page, scraper.last_keys = frontier, self.keys[frontier]
+        for stored in [stored for stored in self.keys if stored < frontier]:
+            del self.keys[stored]
+        return new
+
+    def parse_stage(self):
+        """Parse, dedup and store pages; hand checkpoint batches to the writer"""
+        scraper = self.scraper
+        stalled_pages = 0
+        try:
+            while True:
+                item = self.pages.get()
+                if item is DONE:
+                    break
+                page, html = item
+                if scraper.config.get('archive', {}).get('enabled'):
+                    scraper.archive_page(page, html)
+                with scraper.metrics.time('parse'):
+                    records = rows_to_records(parse_table_html(html), scraper.COLUMN_MAPPING)
+                if not records:
+                    scraper.metrics.inc('failures')
+                    scraper.metrics.emit('page', page=page, rows=0)
+                    attempt = self.attempts[page] = self.attempts.get(page, 0) + 1
+                    self.retries.put((page, attempt))
+                    self.page_done()
+                    continue
+
+                if self.store(page, records):
+                    stalled_pages = 0
+                else:
+                    stalled_pages += 1
+                    if scraper.stalled(stalled_pages):
+                        self.stop.set()
+
+                if page % scraper.checkpoint_interval == 0:
+                    batch = scraper.checkpoint_batch()
+                    scraper.checkpointed = batch[3]
+                    # The writer always drains, so this only waits while it catches up
+                    self.batches.put(batch)
+                self.page_done()
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.batches.put(DONE)
+
+    def write_stage(self):
+        """Append checkpoint segments; only this thread touches the sink while running"""
+        try:
+            while True:
+                batch = self.batches.get()
+                if batch is DONE:
+                    break
+                self.scraper.write_checkpoint(batch)
+        except Exception as e:
+            self.fail(e)
+            # Keep draining so the parse stage never blocks on a dead writer
+            while self.batches.get() is not DONE:
+                pass
@@ -0,0 +1,126 @@
+"""
+Page readiness for CCR
+Waits for ADF partial page renders to finish instead of sleeping a fixed time
+"""
+
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+from ccr_table import HEADER_ROWS, INVALID_KEYS, MIN_CELLS, TABLE_ID
+
+
+# Returns the ADF busy state and a fingerprint of the results table:
+# [first registration number, last registration number, data row count].
+# The page counts as busy while the document is loading (readyState not in
+# arguments[4]), while ADF still has requests in flight, or while a blocking
+# glass pane is shown.
+READY_STATE_SCRIPT = """
+var busy = arguments[4].indexOf(document.readyState) === -1;
+try {
+    if (window.AdfPage && AdfPage.PAGE && AdfPage.PAGE.isSynchronizedWithServer) {
+        busy = busy || !AdfPage.PAGE.isSynchronizedWithServer();
+    }
+} catch (e) {}
+var panes = document.querySelectorAll('[class*="GlassPane"]');
+for (var i = 0; i < panes.length; i++) {
+    if (panes[i].offsetWidth > 0 || panes[i].offsetHeight > 0) { busy = true; }
+}
+var table = document.getElementById(arguments[0]);
+if (!table) { return {busy: busy, fingerprint: null}; }
+var rows = table.getElementsByTagName('tr');
+var keys = [];
+for (var r = arguments[1]; r < rows.length; r++) {
+    var cells = rows[r].getElementsByTagName('td');
+    if (cells.length < arguments[2]) { continue; }
+    var key = (cells[0].innerText || '').trim();
+    if (arguments[3].indexOf(key) === -1) { keys.push(key); }
+}
+if (!keys.length) { return {busy: busy, fingerprint: null}; }
+return {busy: busy, fingerprint: [keys[0], keys[keys.length - 1], keys.length]};
+"""
+
+
+class PageReadiness:
+    """Detects when the results table has settled and holds new rows"""
+
+    def __init__(self, driver, timeout=15, fallback_delay=2, poll_interval=0.1,
+                 ready_states=('complete',)):
+        self.driver = driver
+        self.timeout = timeout
+        self.fallback_delay = fallback_delay
+        self.poll_interval = poll_interval
+        # With an 'eager'/'none' page load strategy the DOM is usable at 'interactive'
+        self.ready_states = list(ready_states)
+        self.timings = []  # (label, seconds, outcome)
+
+    def state(self):
+        """Return (busy, fingerprint) for the current page"""
+        result = self.driver.execute_script(
+            READY_STATE_SCRIPT, TABLE_ID, HEADER_ROWS, MIN_CELLS, list(INVALID_KEYS), self.ready_states)
+        fingerprint = result.get('fingerprint')
+        return result.get('busy', False), tuple(fingerprint) if fingerprint else None
+
+    def fingerprint(self):
+        """Fingerprint of the rows currently in the table, or None"""
+        try:
+            return self.state()[1]
+        except WebDriverException:
+            return None
+
+    def wait(self, label, previous=None, require_rows=True):
+        """Block until the page is idle and the table is ready
+
+        require_rows: the table must hold at least one data row
+        previous: a fingerprint taken before the action; the table must differ from it
+
+        Returns True when ready, False on timeout. If the readiness check itself
+        cannot run, falls back to sleeping fallback_delay seconds.
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        outcome = 'timeout'
+
+        try:
+            while True:
+                busy, fingerprint = self.state()
+                if not busy and (fingerprint or not require_rows) \
+                        and (previous is None or fingerprint != previous):
+                    outcome = 'ready'
+                    break
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(self.poll_interval)
+        except WebDriverException:
+            time.sleep(self.fallback_delay)
+            outcome = 'fallback'
+
+        elapsed = time.monotonic() - start
+        self.timings.append((label, elapsed, outcome))
+        if outcome == 'timeout':
+            print(f"⚠️  Page not ready after {elapsed:.1f}s ({label})")
+        return outcome != 'timeout'
+
+    def wait_for_document(self, label='load'):
+        """Wait for the initial page load, before any table exists"""
+        return self.wait(label, require_rows=False)
+
+    def summary(self):
+        """Per-label wait statistics: count, mean and max seconds, timeouts"""
+        stats = {}
+        for label, seconds, outcome in self.timings:
+            entry = stats.setdefault(label, {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            if outcome != 'ready':
+                entry['timeouts'] += 1
+        for entry in stats.values():
+            entry['mean'] = entry.pop('total') / entry['count']
+        return stats
+
+    def print_summary(self):
+        for label, entry in self.summary().items():
+            print(f"   ⏳ {label}: {entry['count']} waits, "
+                  f"avg {entry['mean']:.2f}s, max {entry['max']:.2f}s, "
+                  f"{entry['timeouts']} timeouts/fallbacks")
@@ -0,0 +1,148 @@
+"""
+Arabic full-text search over CCR outputs
+Builds an SQLite FTS5 trigram index of trade names and owners, folded for
+Arabic (no diacritics or tatweel, one alef/ya/ha form), next to an output
+file. Substring and prefix lookups then use the index instead of loading
+the dataset.
+
+Usage:
+    python ccr_search.py النور                            # trade name or owner, latest index
+    python ccr_search.py "مؤسسة الامل" --field name --prefix
+    python ccr_search.py محمود --field owner --limit 50
+    python ccr_search.py --build ccr_final_20251004_144851.parquet
+"""
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from ccr_normalize import fold_arabic
+
+
+TRADE_NAME = "الإسم التجاري"
+OWNER = "مالك المؤسسة"
+FIELDS = {'name': ['trade_name'], 'owner': ['owner'], 'both': ['trade_name', 'owner']}
+INDEX_SUFFIX = '_search.sqlite'
+
+
+def index_path(output_path):
+    """Where the search index of an output file or directory lives"""
+    return os.path.splitext(output_path.rstrip(os.sep))[0] + INDEX_SUFFIX
+
+
+def build_search_index(records, path):
+    """Index records (dicts) into a fresh SQLite file; returns the path
+
+    names holds the folded trade name and owner (FTS5, trigram tokenizer,
+    so any substring of 3+ characters is an index lookup), and records
+    holds each original row as JSON under the same rowid.
+    """
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    with conn:
+        conn.execute("CREATE VIRTUAL TABLE names USING fts5(trade_name, owner, tokenize='trigram')")
+        conn.execute("CREATE TABLE records (id INTEGER PRIMARY KEY, data TEXT)")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        count = 0
+        batch_names, batch_records = [], []
+        for count, record in enumerate(records, 1):
+            batch_names.append((count, fold_arabic(record.get(TRADE_NAME) or ''),
+                                fold_arabic(record.get(OWNER) or '')))
+            batch_records.append((count, json.dumps(record, ensure_ascii=False, default=str)))
+            if len(batch_names) >= 10000:
+                conn.executemany("INSERT INTO names (rowid, trade_name, owner) VALUES (?, ?, ?)",
+                                 batch_names)
+                conn.executemany("INSERT INTO records VALUES (?, ?)", batch_records)
+                batch_names, batch_records = [], []
+        conn.executemany("INSERT INTO names (rowid, trade_name, owner) VALUES (?, ?, ?)", batch_names)
+        conn.executemany("INSERT INTO records VALUES (?, ?)", batch_records)
+        conn.execute("INSERT INTO names (names) VALUES ('optimize')")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ('records', str(count)), ('built_at', datetime.now().isoformat(timespec='seconds'))])
+    conn.close()
+    os.replace(tmp_path, path)
+    return path
+
+
+def like_text(text):
+    # FTS5 only answers LIKE from the index without an ESCAPE clause, so the
+    # wildcard characters are dropped from the query instead
+    return text.replace('%', '').replace('_', '')
+
+
+def search(path, query, field='both', prefix=False, limit=20):
+    """Records whose trade name/owner contains query (or starts with it, with prefix)
+
+    Returns (records, total matches). Matching is on folded text, so
+    "الأمل", "الامل" and "الأمـــل" find the same companies.
+    """
+    folded = like_text(fold_arabic(query))
+    if len(folded) >= 3:
+        # One LIKE per column, so FTS5 can answer each from the trigram index
+        condition = "{column} LIKE ?"
+        values = [folded + '%' if prefix else '%' + folded + '%']
+    elif prefix:
+        # Too short for a trigram: scan the folded names instead
+        condition, values = "substr({column}, 1, ?) = ?", [len(folded), folded]
+    else:
+        condition, values = "instr({column}, ?) > 0", [folded]
+    matches = " UNION ".join("SELECT rowid FROM names WHERE " + condition.format(column=column)
+                             for column in FIELDS[field])
+    params = values * len(FIELDS[field])
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM ({matches})", params).fetchone()[0]
+        rows = conn.execute(f"SELECT data FROM records WHERE id IN ({matches}) ORDER BY id "
+                            f"LIMIT ?", params + [limit or -1]).fetchall()
+    finally:
+        conn.close()
+    return [json.loads(row[0]) for row in rows], total
+
+
+def latest_index():
+    found = glob.glob('*' + INDEX_SUFFIX)
+    return max(found, key=os.path.getmtime) if found else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search trade names and owners")
+    parser.add_argument('query', nargs='?', help="text to look for")
+    parser.add_argument('--field', choices=list(FIELDS), default='both')
+    parser.add_argument('--prefix', action='store_true', help="match the start of the name only")
+    parser.add_argument('--limit', type=int, default=20, help="rows to show (0 = all)")
+    parser.add_argument('--index', help=f"index file (default: the latest *{INDEX_SUFFIX})")
+    parser.add_argument('--build', metavar='OUTPUT', help="build the index for an existing output")
+    args = parser.parse_args()
+
+    if args.build:
+        from view_data import read_records
+
+        start = time.monotonic()
+        path = build_search_index(read_records(args.build), index_path(args.build))
+        print(f"✓ Search index built in {time.monotonic() - start:.1f}s: {path}")
+        if not args.query:
+            return
+
+    path = args.index or (index_path(args.build) if args.build else latest_index())
+    if not path or not args.query:
+        parser.error("give a query, and --index or --build if no *_search.sqlite exists here")
+
+    start = time.monotonic()
+    records, total = search(path, args.query, args.field, args.prefix, args.limit)
+    elapsed = (time.monotonic() - start) * 1000
+    print(f"🔎 {total:,} matches for '{args.query}' in {elapsed:.0f} ms ({path})\n")
+    for record in records:
+        print(f"  {record.get('رقم التسجيل', '')}  {record.get(TRADE_NAME, '')}  "
+              f"| {record.get(OWNER, '')}  | {record.get('الحالة', '')}")
+    if total > len(records):
+        print(f"\n... {total - len(records):,} more (use --limit)")
+
+
+if __name__ == "__main__":
+    main()
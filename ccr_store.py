@@ -0,0 +1,109 @@
+"""
+Columnar record store for CCR
+Keeps scraped rows as one list per column instead of one dict per row, with
+low-cardinality columns (governorate, status, action) stored as integer codes.
+"""
+
+from array import array
+
+import numpy as np
+import pandas as pd
+
+
+CATEGORICAL_COLUMNS = ("المحافظة", "الحالة", "الإجراء")
+
+
+class RecordStore:
+    """Append-only table of scraped records
+
+    Behaves like the list of dicts the scrapers used to keep: len(), iteration
+    and indexing/slicing yield plain dicts. Missing cells are stored as ''.
+    """
+
+    def __init__(self, columns, categorical=CATEGORICAL_COLUMNS):
+        self.columns = list(columns)
+        self.categorical = [c for c in self.columns if c in categorical]
+        self.values = {c: [] for c in self.columns if c not in self.categorical}
+        self.codes = {c: array('i') for c in self.categorical}
+        self.categories = {c: [] for c in self.categorical}
+        self.lookup = {c: {} for c in self.categorical}
+        self.length = 0
+
+    def _code(self, column, value):
+        lookup = self.lookup[column]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.categories[column])
+            self.categories[column].append(value)
+        return code
+
+    def append(self, record):
+        for column, values in self.values.items():
+            values.append(record.get(column, ''))
+        for column, codes in self.codes.items():
+            codes.append(self._code(column, record.get(column, '')))
+        self.length += 1
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def row(self, index):
+        record = {}
+        for column in self.columns:
+            if column in self.codes:
+                record[column] = self.categories[column][self.codes[column][index]]
+            else:
+                record[column] = self.values[column][index]
+        return record
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        for index in range(self.length):
+            yield self.row(index)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.row(i) for i in range(*key.indices(self.length))]
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("record index out of range")
+        return self.row(key)
+
+    def to_dataframe(self):
+        """DataFrame with categorical dtype for the coded columns
+
+        The code arrays are read through np.frombuffer without an intermediate
+        list; Categorical.from_codes copies them, so the store can keep growing.
+        """
+        data = {}
+        for column in self.columns:
+            if column in self.codes:
+                codes = np.frombuffer(self.codes[column], dtype=np.int32) \
+                    if self.length else np.array([], dtype=np.int32)
+                data[column] = pd.Categorical.from_codes(codes, self.categories[column])
+            else:
+                data[column] = self.values[column]
+        return pd.DataFrame(data, columns=self.columns)
+
+    def to_arrow(self):
+        """pyarrow.Table with dictionary-encoded coded columns (needs pyarrow)
+
+        The codes are copied: Arrow would otherwise hold an export of the
+        array('i') buffers, and the next append could not resize them.
+        """
+        import pyarrow as pa
+
+        arrays = []
+        for column in self.columns:
+            if column in self.codes:
+                codes = pa.array(np.frombuffer(self.codes[column], dtype=np.int32).copy()
+                                 if self.length else [], type=pa.int32())
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    codes, pa.array(self.categories[column], type=pa.string())))
+            else:
+                arrays.append(pa.array(self.values[column], type=pa.string()))
+        return pa.Table.from_arrays(arrays, names=self.columns)
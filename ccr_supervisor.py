@@ -0,0 +1,130 @@
+"""
+Session supervision for long CCR runs
+Decides when the browser/HTTP session should be recycled: every N pages,
+when Chrome's memory or the per-page latency has drifted too far, or when
+ADF reports that the view/session has expired.
+"""
+
+import contextlib
+import statistics
+from collections import deque
+
+from selenium.common.exceptions import WebDriverException
+
+from ccr_http import AdfSessionExpired
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# Text the ADF client shows when the JSF view or HTTP session is gone
+EXPIRED_MARKERS = ['ViewExpiredException', 'انتهت صلاحية', 'Session Expired', 'session has expired']
+
+EXPIRED_SCRIPT = """
+var text = document.body ? document.body.innerText : '';
+for (var i = 0; i < arguments[0].length; i++) {
+    if (text.indexOf(arguments[0][i]) !== -1) { return true; }
+}
+return false;
+"""
+
+
+def browser_rss_mb(driver):
+    """Summed RSS of chromedriver and every Chrome process under it, or None"""
+    service = getattr(driver, 'service', None)
+    process = getattr(service, 'process', None)
+    if psutil is None or process is None:
+        return None
+    try:
+        root = psutil.Process(process.pid)
+        total = root.memory_info().rss
+        for child in root.children(recursive=True):
+            with contextlib.suppress(psutil.Error):
+                total += child.memory_info().rss
+    except psutil.Error:
+        return None
+    return total / (1024 * 1024)
+
+
+def session_expired(driver=None, error=None):
+    """True when an exception or the page itself says the ADF session expired"""
+    if isinstance(error, AdfSessionExpired):
+        return True
+    if error is not None and any(m in str(error) for m in EXPIRED_MARKERS):
+        return True
+    if driver is None:
+        return False
+    try:
+        return bool(driver.execute_script(EXPIRED_SCRIPT, EXPIRED_MARKERS))
+    except WebDriverException:
+        return False
+
+
+class SessionSupervisor:
+    """Tracks session health and says when (and why) to recycle it
+
+    config is config.json's "supervisor" section:
+        recycle_pages        restart the session every N pages (0 = never)
+        max_browser_rss_mb   restart when Chrome's memory exceeds this
+        latency_drift        restart when recent page time exceeds baseline x this
+        latency_window       pages used for the baseline and the recent median
+        max_restarts         restarts in a row without a scraped page before giving up
+        expiry_check_pages   scan the page text for an expired session every N pages
+                             (a failed next or repeatedly empty page is always checked)
+    """
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.enabled = config.get('enabled', True)
+        self.recycle_pages = config.get('recycle_pages', 2000)
+        self.max_rss_mb = config.get('max_browser_rss_mb', 2048)
+        self.drift = config.get('latency_drift', 3.0)
+        self.window = config.get('latency_window', 50)
+        self.max_restarts = config.get('max_restarts', 3)
+        self.expiry_check_pages = config.get('expiry_check_pages', 10)
+        self.restarts = 0
+        self.failed_restarts = 0  # restarts since the last page that yielded rows
+        self.reset()
+
+    def reset(self):
+        """Start measuring a fresh session"""
+        self.pages = 0
+        self.baseline = None
+        self.recent = deque(maxlen=self.window)
+
+    def record_page(self, seconds):
+        self.pages += 1
+        self.failed_restarts = 0
+        self.recent.append(seconds)
+        if self.baseline is None and len(self.recent) == self.window:
+            self.baseline = statistics.median(self.recent)
+
+    def check(self, driver=None):
+        """Reason to recycle the session now, or None"""
+        if not self.enabled:
+            return None
+        if self.recycle_pages and self.pages >= self.recycle_pages:
+            return 'scheduled'
+        # A full text scan of the page, so only every few pages on a healthy run
+        if driver is not None and self.expiry_check_pages \
+                and self.pages % self.expiry_check_pages == 0 and session_expired(driver):
+            return 'session_expired'
+        if driver is not None and self.max_rss_mb and self.pages % 10 == 0:
+            rss = browser_rss_mb(driver)
+            if rss is not None and rss > self.max_rss_mb:
+                return 'memory'
+        if self.baseline and self.drift and len(self.recent) == self.window \
+                and self.pages >= 2 * self.window:
+            if statistics.median(self.recent) > self.baseline * self.drift:
+                return 'latency'
+        return None
+
+    def can_restart(self):
+        return self.enabled and self.failed_restarts < self.max_restarts
+
+    def restarted(self):
+        self.restarts += 1
+        self.failed_restarts += 1
+        self.reset()
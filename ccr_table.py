@@ -0,0 +1,165 @@
+"""
+Results table extraction for CCR
+Reads the whole results table in one WebDriver call instead of one call per cell
+"""
+
+import re
+
+from lxml import html as lxml_html
+
+
+# ADF component ids on the CCR HomePage
+TABLE_ID = "pt1:pt_region0:1:t4"
+SEARCH_BUTTON_ID = "pt1:pt_region0:1:b1"
+NEXT_BUTTON_ID = "pt1:pt_region0:1:t4::nb_nx"
+# The "عرض" link in each row opens the company detail popup
+DETAIL_LINK_ID = TABLE_ID + ":{row}:cl1"
+DETAIL_ID = "pt1:pt_region0:1:detail"
+
+# Search form inputs, keyed like config.json "search_params"
+SEARCH_FIELDS = {
+    'registration_number': "pt1:pt_region0:1:it1",
+    'national_id_investor': "pt1:pt_region0:1:it2",
+    'trade_name': "pt1:pt_region0:1:it3",
+    'national_id_establishment': "pt1:pt_region0:1:it4",
+}
+
+# The first two rows of the table are the filter row and the header row
+HEADER_ROWS = 2
+MIN_CELLS = 3
+MAX_COLUMNS = 9
+INVALID_KEYS = ('', 'عرض')
+
+# Returns every row of the table as an array of cell texts, or null if the
+# table is not on the page. Uses the same descendant lookups as
+# find_elements(By.TAG_NAME, ...) so the row/cell indexes match the old path.
+TABLE_ROWS_SCRIPT = """
+var table = document.getElementById(arguments[0]);
+if (!table) { return null; }
+var rows = table.getElementsByTagName('tr');
+var out = [];
+for (var i = 0; i < rows.length; i++) {
+    var cells = rows[i].getElementsByTagName('td');
+    var texts = [];
+    for (var j = 0; j < cells.length; j++) {
+        texts.push((cells[j].innerText || '').trim());
+    }
+    out.push(texts);
+}
+return out;
+"""
+
+TABLE_HTML_SCRIPT = """
+var table = document.getElementById(arguments[0]);
+return table ? table.outerHTML : null;
+"""
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fetch_table_rows(driver, table_id=TABLE_ID):
+    """Return the table as a list of rows of cell texts (one round trip)"""
+    return driver.execute_script(TABLE_ROWS_SCRIPT, table_id)
+
+
+def fetch_table_html(driver, table_id=TABLE_ID):
+    """Return the table's outerHTML (one round trip)"""
+    return driver.execute_script(TABLE_HTML_SCRIPT, table_id)
+
+
+def parse_table_html(html, table_id=TABLE_ID):
+    """Parse table HTML (a full page or just the table) into rows of cell texts"""
+    if not html:
+        return None
+    root = lxml_html.fromstring(html)
+    found = root.xpath('//*[@id=$id]', id=table_id)
+    table = found[0] if found else root
+
+    rows = []
+    for tr in table.iter('tr'):
+        rows.append([
+            _WHITESPACE.sub(' ', td.text_content()).strip()
+            for td in tr.iter('td')
+        ])
+    return rows
+
+
+def rows_to_records(rows, column_mapping):
+    """Map raw table rows to records, applying the scraper's skip rules"""
+    if not rows:
+        return []
+
+    records = []
+    for cells in rows[HEADER_ROWS:]:
+        if not cells or len(cells) < MIN_CELLS:
+            continue
+
+        row_data = {}
+        for i in range(min(MAX_COLUMNS, len(cells))):
+            column_name = column_mapping.get(i, f"Column_{i+1}")
+            row_data[column_name] = cells[i]
+
+        key = row_data.get(column_mapping[0])
+        if key and key not in INVALID_KEYS:
+            records.append(row_data)
+
+    return records
+
+
+def extract_records(driver, column_mapping, engine='js'):
+    """Extract the current page's records using the configured engine
+
+    engine='js' builds the array of cell texts in the browser,
+    engine='html' pulls the table's outerHTML and parses it with lxml.
+    """
+    if engine == 'html':
+        rows = parse_table_html(fetch_table_html(driver))
+    else:
+        rows = fetch_table_rows(driver)
+    return rows_to_records(rows, column_mapping)
+
+
+def detail_links(html, table_id=TABLE_ID):
+    """{registration number: id of its "عرض" detail link} for the rows of a table render"""
+    if not html:
+        return {}
+    root = lxml_html.fromstring(html)
+    found = root.xpath('//*[@id=$id]', id=table_id)
+    table = found[0] if found else root
+
+    links = {}
+    for tr in table.iter('tr'):
+        cells = tr.xpath('./td')
+        anchors = tr.xpath('.//a[contains(@id, ":cl")]')
+        if cells and anchors:
+            key = _WHITESPACE.sub(' ', cells[0].text_content()).strip()
+            if key not in INVALID_KEYS:
+                links[key] = anchors[0].get('id')
+    return links
+
+
+def parse_detail_html(html):
+    """Company detail popup as {section title: [{column: value}, ...]}
+
+    Each section is a header (h1-h4) followed by a table whose first row
+    holds the column names.
+    """
+    if not html:
+        return {}
+    root = lxml_html.fromstring(html)
+    sections = {}
+    for header in root.xpath('//h1|//h2|//h3|//h4'):
+        tables = header.xpath('following::table[1]')
+        # The table must belong to this header, not to a later one
+        if not tables or tables[0].xpath('preceding::*[self::h1 or self::h2 or self::h3 '
+                                         'or self::h4][1]')[0] is not header:
+            continue
+        rows = [[_WHITESPACE.sub(' ', cell.text_content()).strip()
+                 for cell in tr.xpath('./th|./td')]
+                for tr in tables[0].iter('tr')]
+        if not rows:
+            continue
+        columns = rows[0]
+        title = _WHITESPACE.sub(' ', header.text_content()).strip()
+        sections[title] = [dict(zip(columns, row)) for row in rows[1:] if any(row)]
+    return sections
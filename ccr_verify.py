@@ -0,0 +1,295 @@
+"""
+Completeness check for CCR runs
+Compares what a run stored with what the registry should have returned:
+pages missing from the run's page log, pages with fewer rows than a full
+page, and holes in the registration-number sequence that fall between two
+pages. The result is a compact re-fetch plan of page ranges, and with
+--refetch only those pages are scraped again and their new rows added to
+the run.
+
+Usage:
+    python ccr_verify.py                                   # latest ccr_checkpoint run, report
+    python ccr_verify.py checkpoints/ccr_checkpoint_20251004_144851 --refetch
+    python ccr_verify.py checkpoints/ccr_checkpoint_w*     # the runs of a parallel scrape together
+    python ccr_verify.py --refetch --mock 2000 --drop 40   # try it on a damaged mock run
+"""
+
+import argparse
+import bisect
+import copy
+import glob
+import json
+import os
+import random
+from collections import Counter
+from datetime import datetime
+
+from ccr_checkpoint import CheckpointSink
+from ccr_dedup import KEY_COLUMN
+from ccr_manifest import RunManifest
+from ccr_store import RecordStore
+from scraper_bulk import CCRBulkScraper
+
+
+def load_runs(run_dirs):
+    """(manifests, records, {page: entry}) of one or more checkpoint runs"""
+    manifests, records, pages = [], [], {}
+    for run_dir in run_dirs:
+        manifest = RunManifest.load(run_dir)
+        sink = CheckpointSink(run_dir, manifest.segments)
+        manifests.append(manifest)
+        records.extend(sink.records())
+        pages.update(sink.pages())
+    return manifests, records, pages
+
+
+def page_size(pages):
+    """Rows on a full page: the most common row count"""
+    counts = Counter(entry['rows'] for entry in pages.values())
+    return counts.most_common(1)[0][0] if counts else 0
+
+
+def number_gaps(keys, min_gap):
+    """(below, above) pairs of neighbouring registration numbers with at least min_gap missing"""
+    numbers = sorted({int(key) for key in keys if str(key).isdigit()})
+    return [(low, high) for low, high in zip(numbers, numbers[1:]) if high - low - 1 >= min_gap]
+
+
+def key_pages(pages):
+    """Page key ranges, sorted, for page_of: [(lowest key, highest key, page)]"""
+    ranges = []
+    for page, entry in pages.items():
+        keys = [int(k) for k in (entry.get('first'), entry.get('last')) if str(k).isdigit()]
+        if keys:
+            ranges.append((min(keys), max(keys), page))
+    return sorted(ranges)
+
+
+def page_of(ranges, key):
+    """The page whose key range holds key (or the nearest one below it)"""
+    index = bisect.bisect_right(ranges, (key, float('inf'), 0)) - 1
+    return ranges[max(index, 0)][2] if ranges else None
+
+
+def compact(pages):
+    """Sorted page numbers as [[start, end], ...] runs"""
+    ranges = []
+    for page in sorted(pages):
+        if ranges and page == ranges[-1][1] + 1:
+            ranges[-1][1] = page
+        else:
+            ranges.append([page, page])
+    return ranges
+
+
+def expected_pages(manifest):
+    """Pages a run should have stored: from its first page to the end of its
+    range (a finished run) or to its last checkpointed page (the rest is for resume)"""
+    end = manifest.page
+    if manifest.status == 'complete':
+        end = min([p for p in (manifest.end_page, manifest.total_pages) if p] or [manifest.page])
+    return range(manifest.start_page or 1, end + 1)
+
+
+def verify(run_dirs, min_gap=None):
+    """Check the runs; returns the report with its re-fetch plan
+
+    Each run is checked over its own page range, so the worker runs of a
+    parallel scrape together cover the whole result.
+    """
+    manifests, records, pages = load_runs(run_dirs)
+    size = page_size(pages)
+    complete = all(m.status == 'complete' for m in manifests)
+    total_pages = max((m.total_pages or 0 for m in manifests), default=0)
+    expected = set()
+    for manifest in manifests:
+        expected.update(expected_pages(manifest))
+    last_page = max(expected, default=0)
+
+    missing = sorted(expected - set(pages))
+    short = [page for page, entry in pages.items()
+             if page < last_page and entry['rows'] < size]
+
+    keys = [record.get(KEY_COLUMN) for record in records]
+    gaps = number_gaps(keys, min_gap or size or 1)
+    ranges = key_pages(pages)
+    gap_pages = set()
+    for low, high in gaps:
+        # A hole inside one fully read page is the registry's, not the run's
+        pages_around = sorted({page_of(ranges, low), page_of(ranges, high)} - {None})
+        if len(pages_around) == 2:
+            gap_pages.update(range(pages_around[0], pages_around[1] + 1))
+
+    refetch = set(missing) | set(short) | gap_pages
+    unique = len(set(keys))
+    return {
+        'run_dirs': list(run_dirs),
+        'checked_at': datetime.now().isoformat(timespec='seconds'),
+        'complete': complete,
+        'total_pages': total_pages or None,
+        'last_page': last_page,
+        'pages_expected': len(expected),
+        'page_size': size,
+        'expected_rows': len(expected) * size if size else None,
+        'rows': len(records),
+        'unique_rows': unique,
+        'missing_pages': compact(missing),
+        'short_pages': compact(short),
+        'number_gaps': [[low, high, high - low - 1] for low, high in gaps],
+        'refetch': compact(refetch),
+        'refetch_pages': len(refetch),
+    }
+
+
+def print_report(report, path):
+    print("\n" + "="*70)
+    print(f"🔍 VERIFIED: {', '.join(report['run_dirs'])}")
+    print(f"📄 Pages checked: {report['pages_expected']:,} "
+          f"({'complete run' if report['complete'] else 'up to the last checkpoint'}, "
+          f"{report['page_size']} rows per page)")
+    expected = report['expected_rows']
+    print(f"📊 Rows: {report['unique_rows']:,} unique"
+          + (f" of about {expected:,} expected" if expected else ""))
+    print(f"✗ Missing pages: {sum(e - s + 1 for s, e in report['missing_pages']):,}")
+    print(f"✗ Short pages: {sum(e - s + 1 for s, e in report['short_pages']):,}")
+    print(f"✗ Registration-number gaps: {len(report['number_gaps']):,} "
+          f"({sum(g[2] for g in report['number_gaps']):,} numbers)")
+    print(f"🔁 Re-fetch plan: {report['refetch_pages']:,} pages in "
+          f"{len(report['refetch']):,} ranges -> {path}")
+    print("="*70 + "\n")
+
+
+class RefetchScraper(CCRBulkScraper):
+    """Scrapes only the pages of a re-fetch plan, on top of the runs' rows
+
+    New rows go into the first run as one more checkpoint segment (its
+    manifest page and status are kept), and the combined dataset is saved as
+    ccr_verified_<timestamp>.
+    """
+
+    def __init__(self, config, run_dirs):
+        config = copy.deepcopy(config)
+        # One segment at the end rather than checkpoints at refetched page numbers
+        config.setdefault('checkpoint', {})['interval'] = 10 ** 9
+        super().__init__(config)
+        manifests, records, _ = load_runs(run_dirs)
+        self.manifest = manifests[0]
+        self.sink = CheckpointSink(self.manifest.run_dir, self.manifest.segments)
+        self.data = RecordStore(self.COLUMN_MAPPING.values())
+        self.data.extend(records)
+        self.checkpointed = len(self.data)
+        self.checkpoint_prefix = "ccr_verify"
+
+    def stalled(self, stalled_pages):
+        # Refetched pages are expected to hold mostly known rows
+        return False
+
+    def refetch(self, ranges):
+        recovered = len(self.data)
+        scraped = 0
+        try:
+            self.setup_backend()
+            self.navigate_and_search()
+            self.open_dedup_index()
+            for start, end in ranges:
+                if not self.goto_page(start):
+                    print(f"⚠️  Could not reach page {start:,}, skipping {start:,}-{end:,}")
+                    continue
+                print(f"🔁 Re-fetching pages {start:,}-{end:,}")
+                self.scrape_pages(start, end)
+                scraped += end - start + 1
+        finally:
+            self.close()
+            recovered = len(self.data) - recovered
+            # Keep the run's own progress; only the rows and page log grow
+            self.completed_page, self.last_keys = self.manifest.page, self.manifest.fingerprint
+            self.end_page = self.manifest.end_page
+            self.total_pages = self.manifest.total_pages or self.total_pages
+            self.save_checkpoint(self.manifest.status)
+        print(f"✓ {recovered:,} rows recovered from {scraped:,} pages")
+        if recovered:
+            self.save_final(self.manifest.page, "ccr_verified")
+        return recovered
+
+
+def latest_run(checkpoint_dir):
+    runs = [path for path in glob.glob(os.path.join(checkpoint_dir, "ccr_checkpoint_[0-9]*"))
+            if os.path.exists(os.path.join(path, 'manifest.json'))]
+    return max(runs) if runs else None
+
+
+def mock_run(config, drop):
+    """Scrape a mock registry, then damage the run: drop pages from it and records from some pages"""
+    scraper = CCRBulkScraper(copy.deepcopy(config))
+    scraper.config.setdefault('checkpoint', {})['resume'] = False
+    scraper.run()
+    run_dir = scraper.manifest.run_dir
+    sink = CheckpointSink(run_dir, scraper.manifest.segments)
+    kept = list(sink.records())
+    pages = sink.pages()
+    lost = random.Random(drop).sample(sorted(pages), min(drop, len(pages)))
+    dropped = set()
+    for page in lost:
+        # Odd pages were never stored, even ones came back one row short
+        first, last = int(pages[page]['first']), int(pages[page]['last'])
+        if page % 2:
+            dropped.update(str(k) for k in range(min(first, last), max(first, last) + 1))
+            del pages[page]
+        else:
+            dropped.add(pages[page]['first'])
+            pages[page]['rows'] -= 1
+    for path in sink.segments:
+        os.remove(path)
+    os.remove(sink.pages_path)
+    damaged = CheckpointSink(run_dir, [])
+    damaged.append([r for r in kept if r[KEY_COLUMN] not in dropped], scraper.manifest.page)
+    damaged.append_pages(sorted(pages.values(), key=lambda entry: entry['page']))
+    scraper.manifest.segments = damaged.segments
+    scraper.manifest.save()
+    print(f"🧪 Damaged {run_dir}: {len(lost)} pages, {len(dropped):,} rows removed")
+    return run_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and re-fetch what a run is missing")
+    parser.add_argument('runs', nargs='*', help="checkpoint run directories (default: the latest)")
+    parser.add_argument('--config', default='config.json')
+    parser.add_argument('--min-gap', type=int, help="override verify.min_gap")
+    parser.add_argument('--refetch', action='store_true', help="scrape the planned pages again")
+    parser.add_argument('--mock', type=int, metavar='RECORDS',
+                        help="scrape, damage and verify a local mock run of this many records")
+    parser.add_argument('--drop', type=int, default=20, help="mock: pages to damage")
+    args = parser.parse_args()
+
+    config = copy.deepcopy(CCRBulkScraper(args.config).config)
+    min_gap = args.min_gap or config.get('verify', {}).get('min_gap')
+
+    def check(run_dirs):
+        report = verify(run_dirs, min_gap)
+        path = os.path.join(run_dirs[0], f"verify_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print_report(report, path)
+        return report
+
+    def run(run_dirs):
+        report = check(run_dirs)
+        if args.refetch and report['refetch']:
+            if RefetchScraper(config, run_dirs).refetch(report['refetch']):
+                check(run_dirs)
+
+    if args.mock:
+        from ccr_mock_server import MockCCRServer
+        with MockCCRServer(records=args.mock) as server:
+            config['url'] = server.url
+            run([mock_run(config, args.drop)])
+        return
+
+    run_dirs = args.runs or [latest_run(config.get('checkpoint', {}).get('dir', 'checkpoints'))]
+    if not run_dirs[0]:
+        parser.error("no checkpoint run found; give a run directory")
+    run(run_dirs)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,16 +4,33 @@ This version saves data every N pages to prevent data loss
 """
 
 import time
-import pandas as pd
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import StaleElementReferenceException
+from selenium.common.exceptions import WebDriverException
+from requests import RequestException
+import contextlib
 import json
 from datetime import datetime
 import os
 
+from ccr_archive import PageArchive
+from ccr_browser import ready_states, start_chrome
+from ccr_checkpoint import CheckpointSink
+from ccr_dedup import KEY_COLUMN, DedupIndex
+from ccr_enrich import DetailEnricher
+from ccr_http import AdfError, AdfHttpClient, HttpReadiness
+from ccr_manifest import RunManifest
+from ccr_metrics import Metrics
+from ccr_navigation import fill_search_form, goto_page, read_pagination, search_filters
+from ccr_output import output_size_mb, write_output
+from ccr_pacer import Pacer
+from ccr_pipeline import ScrapePipeline
+from ccr_ready import PageReadiness
+from ccr_store import RecordStore
+from ccr_supervisor import SessionSupervisor, session_expired
+from ccr_table import extract_records, fetch_table_html, parse_table_html, rows_to_records
+
 
 class CCRBulkScraper:
     """Bulk scraper with checkpoint saving"""
@@ -33,74 +50,157 @@ class CCRBulkScraper:
     def __init__(self, config_file='config.json'):
         self.config = self.load_config(config_file)
         self.driver = None
-        self.data = []
-        self.checkpoint_interval = 10  # Save every 10 pages
+        self.http = None
+        self.ready = None
+        self.data = RecordStore(self.COLUMN_MAPPING.values())
+        self.page = 1
+        self.start_page = None
+        self.end_page = None
+        checkpoint = self.config.get('checkpoint', {})
+        self.checkpoint_interval = checkpoint.get('interval', 10)  # Save every 10 pages
+        self.checkpoint_dir = checkpoint.get('dir', 'checkpoints')
+        self.checkpoint_prefix = "ccr_checkpoint"
+        self.sink = None
+        self.manifest = None
+        self.archive = None
+        self.checkpointed = 0  # rows of self.data already written to the sink
+        self.completed_page = 0  # last page whose rows are in self.data
+        self.last_keys = None
+        self.page_log = []  # {page, rows, first, last} of pages stored since the last checkpoint
+        self.total_pages = None
+        self.rows_per_page = None  # rows on the fullest page stored, for browser seeks
+        self.detail_pages = {}  # registration number -> page it was stored from (for enrichment)
+        self.dedup = DedupIndex()
+        self.duplicate_count = 0
+        self.log_prefix = ""
+        self.metrics = Metrics()
+        self.supervisor = SessionSupervisor(self.config.get('supervisor', {}))
+        self.pacer = Pacer(self.config.get('pacer'), metrics=self.metrics)
+        self.last_error = None
+        self.stop_requested = False  # set by subclasses that know when to stop early
+        self.log_every = self.config.get('metrics', {}).get('log_every', 10)
         self.start_time = datetime.now()
         
     def load_config(self, config_file):
+        if isinstance(config_file, dict):
+            return config_file
         if os.path.exists(config_file):
             with open(config_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
         return {}
     
+    def setup_backend(self):
+        """Start a browser, or the HTTP client when config backend is 'http'"""
+        if self.config.get('backend') == 'http':
+            self.http = AdfHttpClient(self.config['url'], timeout=self.config.get('wait_timeout', 15),
+                                      fetch_pages=self.config.get('pagination', {}).get('fetch_pages', 1))
+            self.ready = HttpReadiness(self.http)
+            print("✓ HTTP client initialized")
+        else:
+            self.setup_driver()
+    
     def setup_driver(self):
-        options = webdriver.ChromeOptions()
-        options.add_argument('--start-maximized')
-        options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option('useAutomationExtension', False)
-        
-        self.driver = webdriver.Chrome(options=options)
+        self.driver = start_chrome(self.config)
         self.wait = WebDriverWait(self.driver, self.config.get('wait_timeout', 15))
-        print("✓ WebDriver initialized")
+        self.ready = PageReadiness(self.driver,
+                                   timeout=self.config.get('wait_timeout', 15),
+                                   fallback_delay=self.config.get('page_load_delay', 2),
+                                   ready_states=ready_states(self.config))
+        profile = self.config.get('browser', {}).get('profile', 'default')
+        print(f"✓ WebDriver initialized ({profile} profile)")
+    
+    def start_metrics(self, port=None):
+        """Open the JSONL metrics file (and the Prometheus endpoint when a port is given)"""
+        metrics_config = self.config.get('metrics', {})
+        if not metrics_config.get('enabled', True):
+            return
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(metrics_config.get('dir', 'metrics'),
+                            f"{self.checkpoint_prefix.replace('checkpoint', 'metrics')}_{stamp}.jsonl")
+        self.metrics.open(path)
+        if port:
+            port = self.metrics.serve(port)
+            print(f"📈 Metrics: {path}, http://127.0.0.1:{port}/metrics")
+        else:
+            print(f"📈 Metrics: {path}")
+    
+    def wait_ready(self, label, previous=None):
+        """Readiness wait, timed as its own stage"""
+        with self.metrics.time('wait', label=label):
+            return self.ready.wait(label, previous=previous)
     
     def navigate_and_search(self):
         print(f"Navigating to {self.config['url']}...")
-        self.driver.get(self.config['url'])
-        time.sleep(self.config.get('page_load_delay', 3))
+        self.pacer.acquire()
+        with self.metrics.time('search'):
+            if self.http:
+                self.http.open()
+            else:
+                self.driver.get(self.config['url'])
+                self.ready.wait_for_document()
+            self.search()
+        self.total_pages = self.get_pagination_info()
+        print("✓ Search executed")
+    
+    def search(self):
+        """Run the search with config.json "search_params" (empty = the whole registry)"""
+        filters = search_filters(self.config.get('search_params'))
+        if self.http:
+            return self.http.search(**filters)
         
+        fill_search_form(self.driver, filters, self.config.get('wait_timeout', 15))
+        before = self.ready.fingerprint()
         # Click search button
         search_btn = self.wait.until(EC.element_to_be_clickable((By.ID, "pt1:pt_region0:1:b1")))
         search_btn.click()
-        time.sleep(self.config.get('page_load_delay', 3))
-        print("✓ Search executed")
+        return self.wait_ready('search', previous=before)
     
     def extract_page_data(self):
-        time.sleep(2)
+        self.wait_ready('extract')
         
-        try:
-            main_table = self.driver.find_element(By.ID, "pt1:pt_region0:1:t4")
-            rows = main_table.find_elements(By.TAG_NAME, "tr")
-            
-            page_data = []
-            for row in rows[2:]:
-                try:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    if not cells or len(cells) < 3:
-                        continue
-                    
-                    row_data = {}
-                    for i in range(min(9, len(cells))):
-                        try:
-                            cell_text = cells[i].text.strip()
-                            column_name = self.COLUMN_MAPPING.get(i, f"Column_{i+1}")
-                            row_data[column_name] = cell_text
-                        except:
-                            continue
-                    
-                    if row_data.get("رقم التسجيل") and row_data["رقم التسجيل"] not in ['', 'عرض']:
-                        page_data.append(row_data)
-                        
-                except:
-                    continue
-            
-            return page_data
-        except Exception as e:
-            print(f"Error extracting: {e}")
-            return []
+        with self.metrics.time('extract'):
+            try:
+                if self.config.get('archive', {}).get('enabled'):
+                    html = self.http.table_html if self.http else fetch_table_html(self.driver)
+                    self.archive_page(self.page, html)
+                    return rows_to_records(parse_table_html(html), self.COLUMN_MAPPING)
+                if self.http:
+                    return self.http.extract_records(self.COLUMN_MAPPING)
+                engine = self.config.get('extraction', {}).get('engine', 'js')
+                return extract_records(self.driver, self.COLUMN_MAPPING, engine)
+            except Exception as e:
+                self.metrics.inc('extract_errors')
+                print(f"Error extracting: {e}")
+                return []
+    
+    def archive_page(self, page, html):
+        """Keep the page's raw table HTML in the page archive (opened on first use)"""
+        if not html:
+            return
+        if self.archive is None:
+            archive = self.config.get('archive', {})
+            prefix = self.checkpoint_prefix.replace('checkpoint', 'archive')
+            self.archive = PageArchive.create(archive.get('dir', 'archive'), prefix,
+                                              segment_mb=archive.get('segment_mb', 64),
+                                              level=archive.get('level', 3))
+            print(f"🗄️  Archiving raw pages to {self.archive.run_dir}")
+        with self.metrics.time('archive'):
+            self.archive.append(page, html)
     
     def click_next(self):
+        """Advance the table one page; the strategy that worked is recorded as a label"""
+        with self.metrics.time('next') as labels:
+            labels['strategy'] = self.advance_page()
+            self.metrics.inc('next_clicks', strategy=labels['strategy'])
+            return labels['strategy'] != 'none'
+    
+    def advance_page(self):
+        """Try each way of moving to the next page; returns the strategy used or 'none'"""
+        self.last_error = None
         try:
+            if self.http:
+                return 'http' if self.http.next_page() else 'none'
+            
             # Strategy 1: Direct ID for next button
             try:
                 next_btn = self.driver.find_element(By.ID, "pt1:pt_region0:1:t4::nb_nx")
@@ -108,7 +208,7 @@ class CCRBulkScraper:
                     # Check if not disabled
                     if 'p_AFDisabled' not in next_btn.get_attribute('class'):
                         next_btn.click()
-                        return True
+                        return 'id'
             except:
                 pass
             
@@ -119,7 +219,7 @@ class CCRBulkScraper:
                 for link in next_links:
                     if link.is_displayed() and 'p_AFDisabled' not in link.get_attribute('class'):
                         link.click()
-                        return True
+                        return 'title'
             except:
                 pass
             
@@ -135,111 +235,445 @@ class CCRBulkScraper:
                 """
                 result = self.driver.execute_script(script)
                 if result:
-                    return True
+                    return 'js'
             except:
                 pass
             
-            return False
+            return 'none'
         except Exception as e:
-            return False
+            self.last_error = e
+            return 'none'
     
-    def save_checkpoint(self, page_num, filename_prefix="ccr_checkpoint"):
+    def save_checkpoint(self, status='running'):
+        """Append the rows gathered since the last checkpoint and update the run manifest"""
         if not self.data:
             return
+        batch = self.checkpoint_batch()
+        self.write_checkpoint(batch, status)
+        self.checkpointed = batch[3]
+    
+    def checkpoint_batch(self):
+        """(new records, completed page, page keys, total rows, page log) for the next checkpoint"""
+        pages, self.page_log = self.page_log, []
+        return (self.data[self.checkpointed:], self.completed_page, self.last_keys,
+                len(self.data), pages)
+    
+    def write_checkpoint(self, batch, status='running'):
+        """Write one checkpoint batch as a segment and update the run manifest"""
+        records, page, keys, total, pages = batch
+        with self.metrics.time('checkpoint', status=status):
+            if self.sink is None:
+                self.sink = CheckpointSink.create(self.checkpoint_dir, self.checkpoint_prefix)
+                self.manifest = RunManifest(self.sink.run_dir)
+            
+            filename = self.sink.append(records, page)
+            
+            self.manifest.page = page
+            self.manifest.record_count = total
+            self.manifest.fingerprint = keys
+            self.manifest.segments = self.sink.segments
+            self.manifest.status = status
+            self.manifest.total_pages = self.total_pages
+            if self.manifest.start_page is None:
+                self.manifest.start_page = self.start_page
+            self.manifest.end_page = self.end_page
+            self.manifest.save()
+            # After the manifest, so a logged page always has its rows in a listed segment
+            self.sink.append_pages(pages)
+        if filename is None:
+            return
+        
+        self.metrics.inc('checkpoints')
+        self.metrics.emit('checkpoint', file=filename, page=page,
+                          rows=len(records), total=total, status=status)
+        self.metrics.log_snapshot()
+    
+    def page_keys(self, page_data):
+        """[first, last] registration number of a page, used to recognise it later"""
+        if not page_data:
+            return None
+        return [page_data[0].get("رقم التسجيل"), page_data[-1].get("رقم التسجيل")]
+    
+    def resume(self):
+        """Restore the latest unfinished run and seek past its last checkpointed page
+        
+        Returns the page to scrape next (1 when there is nothing to resume),
+        or None if the checkpointed page was already the last one.
+        """
+        manifest = RunManifest.find_resumable(self.checkpoint_dir, self.checkpoint_prefix)
+        if manifest is None:
+            return 1
+        
+        print(f"↩️  Resuming {manifest.run_dir}: {manifest.record_count:,} records, "
+              f"last page {manifest.page:,}")
+        self.manifest = manifest
+        self.sink = CheckpointSink(manifest.run_dir, manifest.segments)
+        self.data = RecordStore(self.COLUMN_MAPPING.values())
+        self.data.extend(self.sink.records())
+        self.checkpointed = len(self.data)
+        self.completed_page = manifest.page
+        self.last_keys = manifest.fingerprint
+        
+        if not self.goto_page(manifest.page):
+            print(f"⚠️  Could not seek to page {manifest.page:,}, starting from page 1")
+            self.navigate_and_search()
+            return 1
+        
+        # The registry lists newest first, so new registrations can shift pages
+        # (self.page is set first so an archived copy of the page is filed under its number)
+        self.page = manifest.page
+        if self.page_keys(self.extract_page_data()) != manifest.fingerprint:
+            print(f"⚠️  Page {manifest.page:,} no longer matches the checkpoint, scraping it again")
+            return manifest.page
+        
+        before = self.ready.fingerprint()
+        if not self.click_next():
+            print("✓ Checkpointed page was the last page")
+            return None
+        self.wait_ready('next', previous=before)
+        return manifest.page + 1
+    
+    def get_pagination_info(self):
+        """Total number of result pages, from the table's pagination text"""
+        if self.http:
+            return self.http.pagination()[1]
+        current, total = read_pagination(self.driver)
+        return total
+    
+    def goto_page(self, page, reload=False):
+        """Move the results table straight to the given page (reload: fetch it again)"""
+        with self.metrics.time('seek'):
+            if self.http:
+                return self.http.goto_page(page, reload)
+            return goto_page(self.driver, self.ready, page, reload, self.rows_per_page)
+    
+    def open_dedup_index(self):
+        """Seed the dedup index with the rows already held (restored on resume)"""
+        self.dedup.update(record.get(KEY_COLUMN) for record in self.data)
+    
+    def close_backend(self):
+        """Quit the browser / HTTP session (used between session recycles)"""
+        if self.driver:
+            with contextlib.suppress(WebDriverException):
+                self.driver.quit()
+            self.driver = None
+        if self.http:
+            self.http.close()
+            self.http = None
+    
+    def close(self):
+        self.dedup.close()
+        if self.archive:
+            self.archive.close()
+        self.close_backend()
+    
+    def scrape_pages(self, start_page, end_page):
+        """Scrape pages start_page..end_page into self.data, checkpointing as it goes
         
-        df = pd.DataFrame(self.data)
-        df = df.fillna('')
+        The session supervisor may recycle the browser/HTTP session on the way;
+        the run then searches again and seeks back to the page it was on.
+        """
+        self.page = start_page
+        self.start_page = self.start_page or start_page
+        self.end_page = end_page
+        consecutive_failures = 0
+        stalled_pages = 0
         
-        # Remove duplicates
-        df = df.drop_duplicates(subset=['رقم التسجيل'], keep='first')
+        while self.page <= end_page and not self.stop_requested:
+            page_start = time.monotonic()
+            try:
+                page_data = self.extract_page_data()
+                
+                if not page_data:
+                    consecutive_failures += 1
+                    self.metrics.inc('failures')
+                    self.metrics.emit('page', page=self.page, rows=0, failure=consecutive_failures)
+                    print(f"{self.log_prefix}[Page {self.page:,}/{end_page:,}] ✗ No data "
+                          f"(failure {consecutive_failures}/3)")
+                    self.pacer.failure('empty')
+                    if consecutive_failures >= 3:
+                        reason = 'session_expired' if session_expired(self.driver) else 'no_data'
+                        if not self.recover(self.page, reason):
+                            break
+                        consecutive_failures = 0
+                        continue
+                    # The table did not move on: ask for the same page again, or
+                    # start a fresh session on it if it cannot be reloaded
+                    self.metrics.inc('retries')
+                    if not self.goto_page(self.page, reload=True):
+                        if not self.recover(self.page, 'no_data'):
+                            break
+                        consecutive_failures = 0
+                    continue
+                consecutive_failures = 0
+                
+                # A page of nothing but known rows means the table did not move on
+                if self.store_page(self.page, page_data):
+                    stalled_pages = 0
+                else:
+                    stalled_pages += 1
+                    if self.stalled(stalled_pages):
+                        break
+                
+                # Checkpoint save
+                if self.page % self.checkpoint_interval == 0:
+                    self.save_checkpoint()
+                
+                if self.page >= end_page or self.stop_requested or not self.advance(page_start):
+                    break
+            
+            except (WebDriverException, RequestException, AdfError) as e:
+                if not self.recover_from(e, page_done=self.completed_page == self.page):
+                    break
+    
+    def scrape(self, start_page, end_page):
+        """scrape_pages, or the threaded pipeline when config "pipeline.enabled" is set"""
+        pipeline = self.config.get('pipeline', {})
+        if pipeline.get('enabled'):
+            ScrapePipeline(self, pipeline.get('queue_pages', 32),
+                           pipeline.get('queue_checkpoints', 4)).run(start_page, end_page)
+        else:
+            self.scrape_pages(start_page, end_page)
+    
+    def store_page(self, page, page_data):
+        """Dedup a page's records into self.data; returns how many were new"""
+        unique, duplicates = self.dedup.filter(page_data)
+        self.duplicate_count += duplicates
+        self.data.extend(unique)
+        if self.config.get('enrichment', {}).get('enabled'):
+            self.detail_pages.update((record.get(KEY_COLUMN), page) for record in unique)
+        keys = self.page_keys(page_data)
+        self.rows_per_page = max(self.rows_per_page or 0, len(page_data))
+        # A page fetched again (pipeline retries) must not move the resume point back
+        if page >= self.completed_page:
+            self.completed_page = page
+            self.last_keys = keys
+        self.page_log.append({'page': page, 'rows': len(page_data),
+                              'first': keys[0], 'last': keys[1]})
+        self.metrics.inc('pages')
+        self.metrics.inc('rows', len(unique))
+        self.metrics.inc('duplicates', duplicates)
+        self.metrics.emit('page', page=page, rows=len(unique),
+                          duplicates=duplicates, total=len(self.data))
+        if page % self.log_every == 0:
+            self.print_progress(page)
+        return len(unique)
+    
+    def stalled(self, stalled_pages):
+        """Warn about a duplicate-only page; True once pagination looks stuck"""
+        print(f"{self.log_prefix}⚠️  Page {self.completed_page:,} held only duplicates - "
+              f"pagination may have stalled ({stalled_pages}/3)")
+        return stalled_pages >= 3
+    
+    def advance(self, page_start):
+        """Move on from self.page: click next, or recycle the session when the
+        supervisor asks for it or next fails. Returns False at the end of the results."""
+        reason = self.supervisor.check(self.driver)
+        if reason and not self.is_last_page():
+            self.supervisor.record_page(time.monotonic() - page_start)
+        else:
+            before = self.ready.fingerprint()
+            # Pages already in a fetched block cost no request
+            buffered = bool(self.http and self.http.next_buffered)
+            if not buffered:
+                self.pacer.acquire()
+            request_start = time.monotonic()
+            if self.click_next():
+                if not self.wait_ready('next', previous=before):
+                    self.pacer.failure('timeout')
+                elif not buffered:
+                    self.pacer.success(time.monotonic() - request_start)
+                self.supervisor.record_page(time.monotonic() - page_start)
+                self.page += 1
+                return True
+            if self.is_last_page():
+                return False
+            reason = 'session_expired' if session_expired(self.driver, self.last_error) \
+                else 'next_failed'
+            print(f"{self.log_prefix}⚠️  Cannot find next button after page {self.page:,}")
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{filename_prefix}_page{page_num}_{timestamp}.xlsx"
-        df.to_excel(filename, index=False, engine='openpyxl')
+        if not self.recover(self.page + 1, reason):
+            return False
+        self.page += 1
+        return True
+    
+    def recover_from(self, error, page_done):
+        """Recycle after a browser/HTTP/ADF error; page_done says whether self.page was stored"""
+        page = self.page + 1 if page_done else self.page
+        print(f"\n{self.log_prefix}✗ Session error at page {page:,}: {error}")
+        reason = 'session_expired' if session_expired(error=error) else 'error'
+        if not self.recover(page, reason, error=error):
+            return False
+        self.page = page
+        return True
+    
+    def is_last_page(self):
+        """True when the pagination text says the current page is the last one"""
+        try:
+            total = self.get_pagination_info()
+        except Exception:
+            return False
+        return total is not None and self.page >= total
+    
+    def reached_end(self):
+        """True when the rows of the last page asked for, or of the last result page, are stored"""
+        if self.end_page is not None and self.completed_page >= self.end_page:
+            return True
+        try:
+            total = self.get_pagination_info()
+        except Exception:
+            total = None
+        total = total or self.total_pages
+        return total is not None and self.completed_page >= total
+    
+    def recover(self, page, reason, error=None):
+        """Recycle the session and seek to page; rows and dedup state are kept
         
-        elapsed = (datetime.now() - self.start_time).total_seconds()
-        rate = len(df) / (elapsed / 60) if elapsed > 0 else 0
+        Returns False once the supervisor has run out of restarts, or if the
+        page cannot be reached (e.g. it is past the last page). Re-raises error
+        when no restart is allowed.
+        """
+        if reason not in ('scheduled', 'memory'):
+            self.pacer.failure(reason)
+        while self.supervisor.can_restart():
+            print(f"{self.log_prefix}♻️  Recycling session ({reason}), resuming at page {page:,}")
+            self.metrics.inc('restarts', reason=reason)
+            self.supervisor.restarted()
+            try:
+                with self.metrics.time('recycle', reason=reason):
+                    self.close_backend()
+                    self.setup_backend()
+                    self.navigate_and_search()
+                    if self.goto_page(page):
+                        return True
+                print(f"{self.log_prefix}⚠️  Could not seek back to page {page:,}")
+                return False
+            except (WebDriverException, RequestException, AdfError) as e:
+                print(f"{self.log_prefix}✗ Restart failed: {e}")
+                error = e
+        if error is not None:
+            raise error
+        return False
+    
+    def print_progress(self, page):
+        """One status line from the run metrics"""
+        stage = 'parse' if ('parse', ()) in self.metrics.histograms else 'extract'
+        timing = self.metrics.histograms.get((stage, ()))
+        p50 = timing.percentile(50) if timing else None
+        latency = f" | {stage} p50 {p50 * 1000:.0f} ms" if p50 is not None else ""
+        pace = f" | pace {self.pacer.rate:.2f} req/s" if self.pacer.enabled else ""
+        print(f"{self.log_prefix}[Page {page:,}/{self.end_page:,}] {len(self.data):,} records | "
+              f"{self.metrics.throughput():,.0f} rec/min | "
+              f"{self.duplicate_count:,} duplicates{latency}{pace}", flush=True)
+    
+    def save_final(self, pages_scraped, filename_prefix="ccr_final"):
+        """Write the deduplicated dataset to the final output file (once per run)"""
+        print("\n" + "="*70)
+        stem = f"{filename_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        with self.metrics.time('final_save'):
+            paths = write_output(self.data, self.config.get('output', {}), stem)
+        self.metrics.emit('final', files=paths, records=len(self.data), pages=pages_scraped)
+        final_filename = paths[0]
         
-        print(f"\n💾 CHECKPOINT SAVED: {filename}")
-        print(f"   📊 Total records: {len(df):,}")
-        print(f"   ⏱️  Time elapsed: {elapsed/60:.1f} minutes")
-        print(f"   📈 Rate: {rate:.1f} records/minute\n")
+        for path in paths:
+            print(f"✅ FINAL DATA SAVED: {path} ({output_size_mb(path):.1f} MB)")
+        print(f"📊 Total unique records: {len(self.data):,}")
+        if self.duplicate_count:
+            print(f"♻️  Duplicates skipped: {self.duplicate_count:,}")
+        print(f"📄 Total pages scraped: {pages_scraped}")
+        print(f"⏱️  Total time: {(datetime.now() - self.start_time).total_seconds()/60:.1f} minutes")
+        if self.ready:
+            self.ready.print_summary()
+        self.print_stage_summary()
+        print("="*70 + "\n")
+        return final_filename
+    
+    def enrich_details(self, final_filename):
+        """Fetch the detail popup of every scraped company (cached) and save them as JSONL"""
+        enricher = DetailEnricher(self.config['url'], self.config.get('enrichment', {}),
+                                  timeout=self.config.get('wait_timeout', 15), metrics=self.metrics,
+                                  pacer=self.pacer, search=search_filters(self.config.get('search_params')))
+        keys = [record.get(KEY_COLUMN) for record in self.data]
+        try:
+            # Rows restored from a checkpoint have no recorded page and are searched for
+            enricher.enrich(keys, self.detail_pages)
+            path = os.path.splitext(final_filename)[0] + '_details.jsonl'
+            print(f"💾 {enricher.export(keys, path):,} company details saved: {path}")
+            return path
+        finally:
+            enricher.close()
+    
+    def print_stage_summary(self):
+        """Where the time went, per stage"""
+        stages = self.metrics.snapshot()['stages']
+        if not stages:
+            return
+        print("⏱️  Stage timings (count, p50, p95):")
+        for stage, s in sorted(stages.items()):
+            print(f"   {stage:<32}{s['count']:>8,}{s['p50'] * 1000:>10.0f} ms{s['p95'] * 1000:>10.0f} ms")
     
     def run(self):
+        final_filename = None
         try:
             print("\n" + "="*70)
             print("  BULK SCRAPER - Commercial Companies Registry")
             print("="*70 + "\n")
             
-            self.setup_driver()
+            self.start_metrics(self.config.get('metrics', {}).get('prometheus_port'))
+            self.setup_backend()
             self.navigate_and_search()
             
             max_pages = self.config['pagination']['max_pages']
             print(f"🎯 Target: {max_pages:,} pages\n")
             
-            page = 1
-            consecutive_failures = 0
-            
-            while page <= max_pages:
-                print(f"[Page {page:,}/{max_pages:,}] ", end='', flush=True)
-                
-                page_data = self.extract_page_data()
-                
-                if page_data:
-                    self.data.extend(page_data)
-                    print(f"✓ Got {len(page_data)} records | Total: {len(self.data):,}")
-                    consecutive_failures = 0
-                    
-                    # Checkpoint save
-                    if page % self.checkpoint_interval == 0:
-                        self.save_checkpoint(page)
-                    
-                    # Try next page
-                    if page < max_pages:
-                        if self.click_next():
-                            time.sleep(self.config.get('page_load_delay', 2))
-                            page += 1
-                        else:
-                            print("\n⚠️  Cannot find next button")
-                            break
-                    else:
-                        break
-                else:
-                    consecutive_failures += 1
-                    print(f"✗ No data (failure {consecutive_failures}/3)")
-                    if consecutive_failures >= 3:
-                        break
-                    page += 1
+            start_page = 1
+            if self.config.get('checkpoint', {}).get('resume', True):
+                start_page = self.resume()
+            self.open_dedup_index()
+            if start_page is not None:
+                self.scrape(start_page, max_pages)
             
-            # Final save
+            # Final save; a run that gave up before its last page stays resumable
             if self.data:
-                print("\n" + "="*70)
-                df = pd.DataFrame(self.data)
-                df = df.fillna('')
-                df = df.drop_duplicates(subset=['رقم التسجيل'], keep='first')
-                
-                final_filename = f"ccr_final_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-                df.to_excel(final_filename, index=False, engine='openpyxl')
-                
-                print(f"✅ FINAL DATA SAVED: {final_filename}")
-                print(f"📊 Total unique records: {len(df):,}")
-                print(f"📄 Total pages scraped: {page}")
-                print(f"⏱️  Total time: {(datetime.now() - self.start_time).total_seconds()/60:.1f} minutes")
-                print("="*70 + "\n")
+                if start_page is None or self.reached_end():
+                    self.save_checkpoint('complete')
+                else:
+                    self.save_checkpoint('stopped')
+                    print(f"\n⚠️  Stopped after page {self.completed_page:,} of {max_pages:,}; "
+                          f"the next run resumes from there")
+                final_filename = self.save_final(self.completed_page)
             
         except KeyboardInterrupt:
             print("\n\n⚠️  INTERRUPTED BY USER - Saving data...")
             if self.data:
-                self.save_checkpoint(page, "ccr_interrupted")
+                self.save_checkpoint('interrupted')
+                self.save_final(self.completed_page, f"ccr_interrupted_page{self.completed_page}")
         except Exception as e:
             print(f"\n✗ Error: {e}")
             if self.data:
-                self.save_checkpoint(page, "ccr_error")
+                self.save_checkpoint('error')
+                self.save_final(self.completed_page, f"ccr_error_page{self.completed_page}")
         finally:
-            if self.driver:
-                self.driver.quit()
-
+            self.close()
+        
+        # The scrape is saved and marked complete; enrichment cannot undo that
+        try:
+            if final_filename and self.config.get('enrichment', {}).get('enabled'):
+                self.enrich_details(final_filename)
+        except KeyboardInterrupt:
+            print("\n⚠️  Enrichment interrupted; details fetched so far stay in the cache")
+        except Exception as e:
+            print(f"\n✗ Enrichment failed: {e}; the scraped data is saved in {final_filename}")
+        finally:
+            self.metrics.close()
 
 if __name__ == "__main__":
     scraper = CCRBulkScraper()
-    scraper.run()
+    if scraper.config.get('partition', {}).get('enabled'):
+        from ccr_partition import PartitionedScraper
+        PartitionedScraper(scraper.config).run()
+    elif scraper.config.get('parallel', {}).get('workers', 1) > 1:
+        from ccr_parallel import ParallelBulkScraper
+        ParallelBulkScraper(scraper.config).run()
+    else:
+        scraper.run()
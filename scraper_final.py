@@ -4,16 +4,22 @@ This version includes proper column naming and better data extraction
 """
 
 import time
-import pandas as pd
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 import json
 from datetime import datetime
 import os
 
+from ccr_browser import ready_states, start_chrome
+from ccr_dedup import DedupIndex
+from ccr_http import AdfHttpClient, HttpReadiness
+from ccr_navigation import fill_search_form, search_filters
+from ccr_output import write_output
+from ccr_ready import PageReadiness
+from ccr_store import RecordStore
+from ccr_table import extract_records
+
 
 class CCRScraperFinal:
     """Production-ready Scraper for Commercial Companies Registry"""
@@ -35,10 +41,14 @@ class CCRScraperFinal:
         """Initialize the scraper with configuration"""
         self.config = self.load_config(config_file)
         self.driver = None
-        self.data = []
+        self.http = None
+        self.data = RecordStore(self.COLUMN_MAPPING.values())
+        self.dedup = DedupIndex()
         
     def load_config(self, config_file):
-        """Load configuration from JSON file"""
+        """Load configuration from JSON file (or use a config dict as given)"""
+        if isinstance(config_file, dict):
+            return config_file
         if os.path.exists(config_file):
             with open(config_file, 'r', encoding='utf-8') as f:
                 return json.load(f)
@@ -60,45 +70,68 @@ class CCRScraperFinal:
                 "scrape_all_pages": True,
                 "max_pages": 100
             },
+            "backend": "browser",
+            "browser": {
+                "profile": "default"
+            },
+            "extraction": {
+                "engine": "js"
+            },
             "output": {
                 "format": "excel",
-                "filename": "ccr_data_{date}.xlsx"
+                "filename": "ccr_data_{date}.xlsx",
+                "partition_by": None,
+                "xlsx_export": False
             }
         }
     
+    def setup_backend(self):
+        """Setup Chrome WebDriver, or the HTTP client when config backend is 'http'"""
+        if self.config.get('backend') == 'http':
+            self.http = AdfHttpClient(self.config['url'], timeout=self.config['wait_timeout'])
+            self.ready = HttpReadiness(self.http)
+            print("✓ HTTP client initialized successfully")
+        else:
+            self.setup_driver()
+    
     def setup_driver(self):
-        """Setup Chrome WebDriver"""
-        options = webdriver.ChromeOptions()
-        options.add_argument('--start-maximized')
-        options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        options.add_experimental_option('useAutomationExtension', False)
-        
-        # Uncomment to run headless
-        # options.add_argument('--headless')
-        
-        self.driver = webdriver.Chrome(options=options)
+        """Setup Chrome WebDriver (set "browser.profile" to "lean" to run headless)"""
+        self.driver = start_chrome(self.config)
         self.wait = WebDriverWait(self.driver, self.config['wait_timeout'])
+        self.ready = PageReadiness(self.driver,
+                                   timeout=self.config['wait_timeout'],
+                                   fallback_delay=self.config['page_load_delay'],
+                                   ready_states=ready_states(self.config))
         print("✓ WebDriver initialized successfully")
     
     def navigate_to_page(self):
         """Navigate to the main page"""
         print(f"Navigating to {self.config['url']}...")
-        self.driver.get(self.config['url'])
-        time.sleep(self.config['page_load_delay'])
+        if self.http:
+            self.http.open()
+        else:
+            self.driver.get(self.config['url'])
+            self.ready.wait_for_document()
         print("✓ Page loaded successfully")
     
     def click_search(self):
         """Click the search button"""
         print("Clicking search button...")
         
+        filters = search_filters(self.config.get('search_params'))
         try:
+            if self.http:
+                self.http.search(**filters)
+                print("✓ Search button clicked")
+                return True
+            
+            fill_search_form(self.driver, filters, self.config['wait_timeout'])
             search_btn = self.wait.until(
                 EC.element_to_be_clickable((By.ID, "pt1:pt_region0:1:b1"))
             )
             search_btn.click()
             print("✓ Search button clicked")
-            time.sleep(self.config['page_load_delay'])
+            self.ready.wait('search')
             return True
         except Exception as e:
             print(f"✗ Error clicking search button: {e}")
@@ -109,44 +142,15 @@ class CCRScraperFinal:
         print("Extracting table data...")
         
         try:
-            # Wait for dynamic content to load
-            time.sleep(3)
-            
-            # Find the main data table
-            main_table = self.driver.find_element(By.ID, "pt1:pt_region0:1:t4")
+            # Wait for the partial page render to finish
+            self.ready.wait('extract')
             
-            # Get all rows
-            rows = main_table.find_elements(By.TAG_NAME, "tr")
-            print(f"Found {len(rows)} total rows in table")
-            
-            page_data = []
-            
-            # Extract data - skip first 2 rows (filter row and header row)
-            for row_idx, row in enumerate(rows[2:], start=2):
-                try:
-                    cells = row.find_elements(By.TAG_NAME, "td")
-                    
-                    if not cells or len(cells) < 3:
-                        continue
-                    
-                    # Extract text from first 9 columns (the main data columns)
-                    row_data = {}
-                    for i in range(min(9, len(cells))):
-                        try:
-                            cell_text = cells[i].text.strip()
-                            column_name = self.COLUMN_MAPPING.get(i, f"Column_{i+1}")
-                            row_data[column_name] = cell_text
-                        except (StaleElementReferenceException, IndexError):
-                            continue
-                    
-                    # Only add rows with registration number
-                    if row_data.get("رقم التسجيل") and row_data["رقم التسجيل"] not in ['', 'عرض']:
-                        page_data.append(row_data)
-                        
-                except StaleElementReferenceException:
-                    continue
-                except Exception as e:
-                    continue
+            # Read the whole table in a single round trip
+            if self.http:
+                page_data = self.http.extract_records(self.COLUMN_MAPPING)
+            else:
+                engine = self.config.get('extraction', {}).get('engine', 'js')
+                page_data = extract_records(self.driver, self.COLUMN_MAPPING, engine)
             
             print(f"✓ Extracted {len(page_data)} valid rows")
             return page_data
@@ -158,6 +162,9 @@ class CCRScraperFinal:
     def get_pagination_info(self):
         """Get total pages and current page info"""
         try:
+            if self.http:
+                return self.http.pagination()[1]
+            
             # Look for pagination text like "الصفحة 1 من (المجموع) 11848 (من 5-1) جزء"
             pagination_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'الصفحة') or contains(text(), 'من')]")
             for elem in pagination_elements:
@@ -177,6 +184,9 @@ class CCRScraperFinal:
     def click_next_page(self):
         """Click the next page button"""
         try:
+            if self.http:
+                return self.http.next_page()
+            
             # Strategy 1: Look for "›" or next arrow in the pagination area
             next_links = self.driver.find_elements(By.XPATH, "//a[contains(text(), '›') or contains(text(), '>')]")
             for link in next_links:
@@ -252,15 +262,19 @@ class CCRScraperFinal:
                     break
             else:
                 consecutive_failures = 0  # Reset on success
-                self.data.extend(page_data)
+                unique, duplicates = self.dedup.filter(page_data)
+                self.data.extend(unique)
+                if duplicates:
+                    print(f"♻️  Skipped {duplicates} duplicate rows")
                 print(f"📈 Total records so far: {len(self.data)}")
             
             # Try to go to next page
             if page_number < max_pages:
                 print("Attempting to navigate to next page...")
+                before = self.ready.fingerprint()
                 if self.click_next_page():
                     print("✓ Navigated to next page")
-                    time.sleep(self.config['page_load_delay'])
+                    self.ready.wait('next', previous=before)
                     page_number += 1
                 else:
                     print("✓ Could not find next page button - reached end")
@@ -275,34 +289,24 @@ class CCRScraperFinal:
             print("⚠ No data to save")
             return None
         
-        # Create DataFrame
-        df = pd.DataFrame(self.data)
-        
-        # Clean up the data
-        df = df.fillna('')
-        
         # Generate filename with current date
         date_str = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = self.config['output']['filename'].replace('{date}', date_str)
+        stem = os.path.splitext(filename)[0]
         
         # Save based on format
-        output_format = self.config['output']['format']
+        paths = write_output(self.data, self.config['output'], stem)
+        filename = paths[0]
         
-        if output_format == 'csv':
-            filename = filename.replace('.xlsx', '.csv')
-            df.to_csv(filename, index=False, encoding='utf-8-sig')
-        else:
-            df.to_excel(filename, index=False, engine='openpyxl')
-        
-        print(f"\n✓ Data saved to: {filename}")
-        print(f"✓ Total rows: {len(df)}")
-        print(f"✓ Columns: {list(df.columns)}")
+        for path in paths:
+            print(f"\n✓ Data saved to: {path}")
+        print(f"✓ Total rows: {len(self.data)}")
+        print(f"✓ Columns: {self.data.columns}")
         
         # Show sample data
-        if len(df) > 0:
+        if len(self.data) > 0:
             print(f"\nSample data (first row):")
-            for col in df.columns:
-                value = df[col].iloc[0]
+            for col, value in self.data[0].items():
                 if value:
                     print(f"  {col}: {value}")
         
@@ -316,7 +320,7 @@ class CCRScraperFinal:
             print("="*60 + "\n")
             
             # Setup
-            self.setup_driver()
+            self.setup_backend()
             self.navigate_to_page()
             
             # Click search (with empty params = all results)
@@ -326,11 +330,12 @@ class CCRScraperFinal:
                     self.handle_pagination()
                 else:
                     page_data = self.extract_table_data()
-                    self.data.extend(page_data)
+                    self.data.extend(self.dedup.filter(page_data)[0])
                 
                 # Save results
                 if self.data:
                     self.save_data()
+                    self.ready.print_summary()
                     print("\n✓ Scraping completed successfully!")
                 else:
                     print("\n⚠ No data was extracted")
@@ -345,6 +350,8 @@ class CCRScraperFinal:
                 print("\nClosing browser in 3 seconds...")
                 time.sleep(3)
                 self.driver.quit()
+            if self.http:
+                self.http.close()
 
 
 def main():
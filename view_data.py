@@ -1,30 +1,218 @@
 """
 Quick data viewer to check the scraped data
+Reads outputs lazily: only the requested columns and matching rows are loaded,
+and row counts come from file metadata where the format has it.
+
+Usage:
+    python view_data.py                                  # summary of the latest output
+    python view_data.py ccr_final_20251004_144851.parquet
+    python view_data.py --list                           # every output found
+    python view_data.py --count --governorate عمان
+    python view_data.py --columns "رقم التسجيل,الإسم التجاري" --status قائمة --limit 20
+    python view_data.py --date-from 2020/01/01 --date-to 2020/12/31
 """
-import pandas as pd
+
+import argparse
 import glob
+import os
+import sys
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+
+GOVERNORATE = "المحافظة"
+STATUS = "الحالة"
+REG_DATE = "تاريخ التسجيل"
+
+OUTPUT_PATTERNS = ['ccr_final_*', 'ccr_data_*', 'ccr_reparsed_*', 'ccr_verified_*',
+                   'ccr_interrupted_*', 'ccr_error_*', os.path.join('checkpoints', 'ccr_checkpoint_*')]
+
+
+def find_outputs():
+    """Every scraper output (files, partitioned directories, checkpoint runs), newest last"""
+    found = set()
+    for pattern in OUTPUT_PATTERNS:
+        for path in glob.glob(pattern):
+            if path.endswith('_rejects.csv'):
+                continue
+            if os.path.isdir(path) or path.endswith(('.parquet', '.csv', '.xlsx')):
+                found.add(path)
+    return sorted(found, key=os.path.getmtime)
+
+
+def open_dataset(path):
+    """pyarrow dataset over a Parquet file/directory, CSV file or checkpoint run"""
+    if os.path.isdir(path):
+        segments = sorted(glob.glob(os.path.join(path, 'segment_*.jsonl')))
+        if segments:
+            return ds.dataset(segments, format='json')
+        return ds.dataset(path, format='parquet', partitioning='hive')
+    if path.endswith('.csv'):
+        return ds.dataset(path, format='csv')
+    return ds.dataset(path, format='parquet')
+
+
+def read_records(path):
+    """Every record of a scraper output as a dict of strings"""
+    if path.endswith('.xlsx'):
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(path, read_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(h) for h in next(rows)]
+        for row in rows:
+            yield {name: '' if value is None else str(value) for name, value in zip(header, row)}
+        workbook.close()
+        return
+
+    for batch in open_dataset(path).to_batches():
+        for record in batch.to_pylist():
+            yield {name: '' if value is None else str(value) for name, value in record.items()}
+
+
+def build_filter(schema, args):
+    """Pushdown expression for the governorate/status/date options"""
+    expr = None
+
+    def both(a, b):
+        return b if a is None else a & b
+
+    if args.governorate:
+        expr = both(expr, ds.field(GOVERNORATE) == args.governorate)
+    if args.status:
+        expr = both(expr, ds.field(STATUS) == args.status)
+
+    if args.date_from or args.date_to:
+        date_type = schema.field(REG_DATE).type
+        if pa.types.is_timestamp(date_type) or pa.types.is_date(date_type):
+            def cast(value):
+                day = datetime.strptime(value.replace('-', '/'), '%Y/%m/%d')
+                return pa.scalar(day, type=pa.timestamp('s')).cast(date_type)
+        else:
+            def cast(value):
+                return value.replace('-', '/')
+        if args.date_from:
+            expr = both(expr, ds.field(REG_DATE) >= cast(args.date_from))
+        if args.date_to:
+            expr = both(expr, ds.field(REG_DATE) <= cast(args.date_to))
+    return expr
+
+
+def query_arrow(path, columns, args):
+    """Run the query on a dataset; returns (table, total matching rows)"""
+    dataset = open_dataset(path)
+    expr = build_filter(dataset.schema, args)
+    total = dataset.count_rows(filter=expr)
+    if args.count:
+        return None, total
+
+    scanner = dataset.scanner(columns=columns, filter=expr)
+    table = scanner.head(args.limit) if args.limit else scanner.to_table()
+    return table, total
+
+
+def query_xlsx(path, columns, args):
+    """Stream an xlsx row by row, stopping as soon as --limit rows matched"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    sheet = workbook.active
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(h) for h in next(rows)]
+    index = {name: i for i, name in enumerate(header)}
+    wanted = columns or header
+
+    def matches(row):
+        if args.governorate and row[index[GOVERNORATE]] != args.governorate:
+            return False
+        if args.status and row[index[STATUS]] != args.status:
+            return False
+        date = str(row[index[REG_DATE]] or '').replace('-', '/')
+        if args.date_from and date < args.date_from.replace('-', '/'):
+            return False
+        if args.date_to and date > args.date_to.replace('-', '/'):
+            return False
+        return True
+
+    filtered = args.governorate or args.status or args.date_from or args.date_to
+    if args.count and not filtered:
+        # Row count straight from the sheet dimensions
+        total = (sheet.max_row or 1) - 1
+        workbook.close()
+        return None, total
+
+    # Without --count, stop reading at --limit matches; the total is then unknown
+    out = {name: [] for name in wanted}
+    total = 0
+    for row in rows:
+        if not matches(row):
+            continue
+        total += 1
+        if args.count:
+            continue
+        for name in wanted:
+            out[name].append(row[index[name]])
+        if args.limit and total >= args.limit:
+            total = None
+            break
+    workbook.close()
+    return (None if args.count else pa.table(out)), total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="View and query scraped CCR data")
+    parser.add_argument('path', nargs='?', help="output file or directory (default: latest)")
+    parser.add_argument('--list', action='store_true', help="list the outputs found")
+    parser.add_argument('--columns', help="comma-separated columns to show")
+    parser.add_argument('--governorate', help=f"only rows where {GOVERNORATE} equals this")
+    parser.add_argument('--status', help=f"only rows where {STATUS} equals this")
+    parser.add_argument('--date-from', help="registration date from (YYYY/MM/DD)")
+    parser.add_argument('--date-to', help="registration date to (YYYY/MM/DD)")
+    parser.add_argument('--limit', type=int, default=5, help="rows to show (0 = all)")
+    parser.add_argument('--count', action='store_true', help="only print the number of rows")
+    args = parser.parse_args()
+
+    outputs = find_outputs()
+    if args.list:
+        for path in outputs:
+            print(path)
+        return
+
+    path = args.path or (outputs[-1] if outputs else None)
+    if not path:
+        print("No data files found!")
+        sys.exit(1)
+    print(f"Reading: {path}\n")
+
+    columns = [c.strip() for c in args.columns.split(',')] if args.columns else None
+    if path.endswith('.xlsx'):
+        table, total = query_xlsx(path, columns, args)
+    else:
+        table, total = query_arrow(path, columns, args)
 
-# Find the latest Excel file
-excel_files = glob.glob('ccr_data_*.xlsx')
-if not excel_files:
-    print("No data files found!")
-    exit()
+    if total is None:
+        print("Total rows: not counted for xlsx (use --count)")
+    else:
+        print(f"Total rows: {total:,}")
+    if table is None:
+        return
 
-latest_file = max(excel_files)
-print(f"Reading: {latest_file}\n")
+    print(f"Total columns: {table.num_columns}")
+    print("\nColumns:")
+    for i, col in enumerate(table.column_names, 1):
+        print(f"  {i}. {col}")
 
-# Read the data
-df = pd.read_excel(latest_file)
+    df = table.to_pandas()
+    print(f"\nFirst {len(df)} rows:")
+    print(df.to_string(index=False))
 
-print(f"Total rows: {len(df)}")
-print(f"Total columns: {len(df.columns)}")
-print("\nColumns:")
-for i, col in enumerate(df.columns, 1):
-    print(f"  {i}. {col}")
+    if len(df) > 0:
+        print("\nSample data from first row:")
+        for col in df.columns:
+            print(f"  {col}: {df[col].iloc[0]}")
 
-print("\nFirst few rows:")
-print(df.head())
 
-print("\nSample data from first row:")
-for col in df.columns:
-    print(f"  {col}: {df[col].iloc[0] if len(df) > 0 else 'N/A'}")
+if __name__ == "__main__":
+    main()